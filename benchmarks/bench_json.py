@@ -0,0 +1,69 @@
+"""
+Decoding and encoding time of DRF device list pages, with each json codec installed.
+
+    python -m benchmarks.bench_json
+"""
+import time
+
+from drf_requests_jwt.json_codecs import JsonCodec, OrjsonCodec, UjsonCodec, orjson, ujson
+
+PAGES = 200
+PAGE_SIZE = 100
+
+
+def build_page(page):
+    results = []
+    for index in range((page - 1) * PAGE_SIZE, page * PAGE_SIZE):
+        results.append({
+            'id': index,
+            'eui': '{:016x}'.format(index),
+            'name': 'Device {}'.format(index),
+            'is_active': index % 7 != 0,
+            'firmware': {'version': '2.{}.{}'.format(index % 5, index % 11), 'channel': 'stable'},
+            'location': {'latitude': 47.1585 + index / 1e5, 'longitude': 27.6014 - index / 1e5},
+            'tags': ['sensor', 'outdoor', 'zone-{}'.format(index % 13)],
+            'readings': [{'kind': 'temperature', 'value': 21.5 + index % 9 / 10}, {'kind': 'humidity', 'value': 48}],
+            'created_at': '2020-01-{:02d}T08:30:00Z'.format(index % 28 + 1),
+            'updated_at': '2020-02-{:02d}T12:45:10.123456Z'.format(index % 28 + 1),
+        })
+
+    return {
+        'count': PAGES * PAGE_SIZE,
+        'next': 'https://api.example.com/api/devices/?page={}'.format(page + 1) if page < PAGES else None,
+        'previous': 'https://api.example.com/api/devices/?page={}'.format(page - 1) if page > 1 else None,
+        'results': results
+    }
+
+
+def main():
+    pages = [build_page(page) for page in range(1, PAGES + 1)]
+    contents = [JsonCodec().dumps(page) for page in pages]
+    megabytes = sum(len(content) for content in contents) / 1e6
+
+    codec_classes = [JsonCodec]
+    if orjson is not None:
+        codec_classes.append(OrjsonCodec)
+    if ujson is not None:
+        codec_classes.append(UjsonCodec)
+
+    for codec_class in codec_classes:
+        codec = codec_class()
+
+        start = time.perf_counter()
+        for content in contents:
+            codec.loads(content)
+        decode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for page in pages:
+            for result in page['results']:
+                codec.dumps(result)
+        encode_time = time.perf_counter() - start
+
+        print('{:<12} decode {:>8.1f} MB/s, encode {:>8.1f} MB/s'.format(
+            codec_class.__name__, megabytes / decode_time, megabytes / encode_time
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+Client overhead per page of following the `next` links, from the link to the prepared request,
+merging the link query into the params, and requesting the cursor and limit offset links as they are.
+
+    python -m benchmarks.bench_next_url
+"""
+import time
+
+import requests
+
+from drf_requests_jwt.services import HttpRequestService
+
+PAGES = 20000
+
+NEXT_URLS = {
+    'cursor': 'https://api.example.com/api/devices/?cursor=cD0yMDIwLTAxLTAxKzAwJTNBMDAlM0EwMA%3D%3D&kind=sensor',
+    'limit offset': 'https://api.example.com/api/devices/?kind=sensor&limit=100&offset=4200',
+}
+
+
+class DeviceHttpRequestService(HttpRequestService):
+    cache_backend_class = 'drf_requests_jwt.backends.memory_cache.MemoryCacheBackend'
+
+    def _get_base_url(self):
+        return 'https://api.example.com'
+
+    def _get_url_path(self):
+        return '/api/devices/'
+
+    def _get_jwt_login_url_path(self):
+        return '/api/auth/jwt/login/'
+
+    def _get_username(self):
+        return 'benchmark'
+
+    def _get_password(self):
+        return 'benchmark'
+
+    def _get_params(self):
+        return {'kind': 'sensor', 'updated_at__gt': '2020-01-01T00:00:00Z'}
+
+
+def measure(get_request, next_url):
+    start = time.perf_counter()
+
+    for _ in range(PAGES):
+        url, params = get_request(next_url)
+        requests.Request('GET', url, params=params).prepare()
+
+    return (time.perf_counter() - start) / PAGES * 1e6
+
+
+def main():
+    service = DeviceHttpRequestService()
+
+    def merged_request(next_url):
+        return service._split_next_url(next_url), service.params
+
+    for pagination, next_url in NEXT_URLS.items():
+        print('{:<14} merged {:>7.1f} us per page, as is {:>7.1f} us per page'.format(
+            pagination, measure(merged_request, next_url), measure(service._get_next_request, next_url)
+        ))
+
+
+if __name__ == '__main__':
+    main()
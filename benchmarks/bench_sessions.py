@@ -0,0 +1,56 @@
+"""
+Connections opened per sync, with a session per service and with a session shared per base url.
+
+    python -m benchmarks.bench_sessions
+"""
+from drf_requests_jwt.backends.memory_cache import MemoryCacheBackend
+from drf_requests_jwt.services import HttpRequestService
+
+from benchmarks.server import DEVICES_PATH, LOGIN_PATH, StandInServer
+
+SYNCS = 50
+
+
+class BenchmarkCacheBackend(MemoryCacheBackend):
+    wrapped_backend_class = None
+
+
+def build_service_class(base_url, session_backend_class):
+    class DeviceHttpRequestService(HttpRequestService):
+        cache_backend_class = 'benchmarks.bench_sessions.BenchmarkCacheBackend'
+
+        def _get_base_url(self):
+            return base_url
+
+        def _get_url_path(self):
+            return DEVICES_PATH
+
+        def _get_jwt_login_url_path(self):
+            return LOGIN_PATH
+
+        def _get_username(self):
+            return 'benchmark'
+
+        def _get_password(self):
+            return 'benchmark'
+
+    DeviceHttpRequestService.session_backend_class = session_backend_class
+    return DeviceHttpRequestService
+
+
+def main():
+    for session_backend_class in ['drf_requests_jwt.sessions.SessionBackend',
+                                  'drf_requests_jwt.sessions.SharedSessionBackend']:
+        with StandInServer(count=500, page_size=50) as server:
+            service_class = build_service_class(server.base_url, session_backend_class)
+
+            for _ in range(SYNCS):
+                service_class().get_results_from_all_pages()
+
+            print('{:<45} {:>6.2f} connections per sync, {:>6.2f} requests per sync'.format(
+                session_backend_class, server.stats['connections'] / SYNCS, server.stats['requests'] / SYNCS
+            ))
+
+
+if __name__ == '__main__':
+    main()
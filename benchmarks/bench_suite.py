@@ -0,0 +1,149 @@
+"""
+Records per second, peak memory, requests per sync and logins per sync of the sync operations,
+against the stand-in server, for each pagination.
+
+    python -m benchmarks.bench_suite
+    python -m benchmarks.bench_suite --count 20000 --latency 0.01 --payload-size 512 --unauthorized-every 25
+
+The peak memory is measured in a separate run, with tracemalloc slowing the code down.
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from drf_requests_jwt.backends.memory_cache import MemoryCacheBackend
+from drf_requests_jwt.deserializers import ObjectListDeserializerMixin
+from drf_requests_jwt.services import HttpRequestService
+
+from benchmarks.server import DEVICES_PATH, LIMIT_OFFSET, LOGIN_PATH, PAGINATIONS, StandInServer
+
+try:
+    import django
+    from django.conf import settings as django_settings
+except ImportError:
+    django = None
+
+
+class BenchmarkCacheBackend(MemoryCacheBackend):
+    wrapped_backend_class = None
+
+
+def build_service_class(base_url, pagination):
+    class DeviceHttpRequestService(HttpRequestService):
+        cache_backend_class = 'benchmarks.bench_suite.BenchmarkCacheBackend'
+        page_size_param = 'limit' if pagination == LIMIT_OFFSET else 'page_size'
+
+        def _get_base_url(self):
+            return base_url
+
+        def _get_url_path(self):
+            return DEVICES_PATH
+
+        def _get_jwt_login_url_path(self):
+            return LOGIN_PATH
+
+        def _get_username(self):
+            return 'benchmark'
+
+        def _get_password(self):
+            return 'benchmark'
+
+    return DeviceHttpRequestService
+
+
+def build_deserializer_service_class(service_class):
+    # Django REST framework needs configured settings, no database is used.
+    if not django_settings.configured:
+        django_settings.configure()
+        django.setup()
+
+    from rest_framework import serializers
+
+    class DeviceSerializer(serializers.Serializer):
+        id = serializers.IntegerField()
+        eui = serializers.CharField(max_length=16)
+        name = serializers.CharField(max_length=64)
+        description = serializers.CharField(required=False)
+
+        def create(self, validated_data):
+            return validated_data
+
+    class DeviceDeserializerHttpRequestService(ObjectListDeserializerMixin, service_class):
+        serializer_class = DeviceSerializer
+
+    return DeviceDeserializerHttpRequestService
+
+
+def get_results_from_all_pages(service_class, directory):
+    return len(service_class().get_results_from_all_pages())
+
+
+def write_results_from_all_pages_to_file(service_class, directory):
+    return service_class().write_results_from_all_pages_to_file(
+        os.path.join(directory, 'devices.jsonl'), format='jsonl'
+    )
+
+
+def get_deserialized_object_list(service_class, directory):
+    return len(build_deserializer_service_class(service_class)().get_deserialized_object_list())
+
+
+OPERATIONS = [get_results_from_all_pages, write_results_from_all_pages_to_file]
+if django is not None:
+    OPERATIONS.append(get_deserialized_object_list)
+
+
+def measure(operation, service_class, syncs):
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        records = sum(operation(service_class, directory) for _ in range(syncs))
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        try:
+            operation(service_class, directory)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return records / elapsed, peak_memory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=5000, help='devices served')
+    parser.add_argument('--page-size', type=int, default=100, help='default page size of the server')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds of server delay per page')
+    parser.add_argument('--payload-size', type=int, default=0, help='bytes of description per device')
+    parser.add_argument('--unauthorized-every', type=int, default=None, help='revoke the token every N requests')
+    parser.add_argument('--syncs', type=int, default=3, help='syncs per measure')
+    parser.add_argument('--pagination', choices=PAGINATIONS, action='append', help='the paginations to measure')
+    args = parser.parse_args()
+
+    print('{:<38} {:<13} {:>12} {:>11} {:>10} {:>9}'.format(
+        'operation', 'pagination', 'records/s', 'peak MiB', 'requests', 'logins'
+    ))
+
+    for pagination in args.pagination or PAGINATIONS:
+        for operation in OPERATIONS:
+            server = StandInServer(
+                count=args.count, page_size=args.page_size, latency=args.latency, pagination=pagination,
+                payload_size=args.payload_size, unauthorized_every=args.unauthorized_every
+            )
+
+            with server:
+                service_class = build_service_class(server.base_url, pagination)
+                records_per_second, peak_memory = measure(operation, service_class, args.syncs)
+
+            # The memory measure is one more sync.
+            syncs = args.syncs + 1
+            print('{:<38} {:<13} {:>12.0f} {:>11.2f} {:>10.1f} {:>9.2f}'.format(
+                operation.__name__, pagination, records_per_second, peak_memory / 2 ** 20,
+                server.stats['requests'] / syncs, server.stats['logins'] / syncs
+            ))
+
+
+if __name__ == '__main__':
+    main()
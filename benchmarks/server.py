@@ -0,0 +1,179 @@
+"""
+A stand-in DRF server for the benchmarks: a JWT login and a device list,
+paginated by page number, limit offset or cursor.
+"""
+import base64
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+LOGIN_PATH = '/api/auth/jwt/login/'
+DEVICES_PATH = '/api/devices/'
+
+PAGE_NUMBER = 'page_number'
+LIMIT_OFFSET = 'limit_offset'
+CURSOR = 'cursor'
+PAGINATIONS = (PAGE_NUMBER, LIMIT_OFFSET, CURSOR)
+
+MAX_PAGE_SIZE = 1000
+
+
+def build_token(lifetime):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+
+    return '{}.{}.signature'.format(
+        encode({'alg': 'HS256', 'typ': 'JWT'}),
+        encode({'exp': int(time.time() + lifetime), 'jti': time.time()})
+    )
+
+
+class StandInServer(object):
+    """
+    Serve `count` devices, `page_size` per page unless the request asks for another size, with `latency` seconds
+    of delay per page and `payload_size` bytes of description per device.
+
+    With `unauthorized_every`, the token of every that many page request is revoked and the request gets a 401.
+    """
+
+    def __init__(self, count=1000, page_size=100, latency=0.0, token_lifetime=300, pagination=PAGE_NUMBER,
+                 payload_size=0, unauthorized_every=None):
+        if pagination not in PAGINATIONS:
+            raise ValueError('Unknown pagination {}'.format(pagination))
+
+        self.count = count
+        self.page_size = page_size
+        self.latency = latency
+        self.token_lifetime = token_lifetime
+        self.pagination = pagination
+        self.payload_size = payload_size
+        self.unauthorized_every = unauthorized_every
+
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.tokens = set()
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._get_handler_class())
+        self.httpd.daemon_threads = True
+        self.base_url = 'http://127.0.0.1:{}'.format(self.httpd.server_address[1])
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count_stat(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+            return self.stats[name]
+
+    def get_device(self, index):
+        device = {'id': index, 'eui': '{:016x}'.format(index), 'name': 'Device {}'.format(index)}
+        if self.payload_size:
+            device['description'] = 'x' * self.payload_size
+        return device
+
+    def get_page(self, query):
+        if self.pagination == LIMIT_OFFSET:
+            page_size = self._get_page_size(query, 'limit')
+            start = int(query.get('offset', ['0'])[0])
+            next_query = dict(query, limit=[str(page_size)], offset=[str(start + page_size)])
+        elif self.pagination == CURSOR:
+            page_size = self._get_page_size(query, 'page_size')
+            start = _decode_cursor(query.get('cursor', [None])[0])
+            next_query = dict(query, cursor=[_encode_cursor(start + page_size)])
+        else:
+            page_size = self._get_page_size(query, 'page_size')
+            page = int(query.get('page', ['1'])[0])
+            start = (page - 1) * page_size
+            next_query = dict(query, page=[str(page + 1)])
+
+        next_url = None
+        if start + page_size < self.count:
+            next_url = '{}{}?{}'.format(self.base_url, DEVICES_PATH, urlencode(next_query, doseq=True))
+
+        page = {
+            'next': next_url,
+            'previous': None,
+            'results': [self.get_device(i) for i in range(start, min(start + page_size, self.count))]
+        }
+        if self.pagination != CURSOR:
+            page['count'] = self.count
+        return page
+
+    def _get_page_size(self, query, param):
+        try:
+            return min(int(query[param][0]), MAX_PAGE_SIZE)
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def _get_handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # The headers and the body are written separately, Nagle would delay the body until the ACK.
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                server.count_stat('connections')
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+                if urlparse(self.path).path != LOGIN_PATH:
+                    return self._send(404, {})
+
+                server.count_stat('logins')
+                token = build_token(server.token_lifetime)
+                server.tokens.add(token)
+                self._send(200, {'access': token, 'refresh': 'refresh'})
+
+            def do_GET(self):
+                url = urlparse(self.path)
+
+                if url.path != DEVICES_PATH:
+                    return self._send(404, {})
+
+                requests = server.count_stat('requests')
+                time.sleep(server.latency)
+
+                token = self.headers.get('Authorization', '')[len('Bearer '):]
+                if server.unauthorized_every and requests % server.unauthorized_every == 0:
+                    server.tokens.discard(token)
+
+                if token not in server.tokens:
+                    server.count_stat('unauthorized')
+                    return self._send(401, {'detail': 'Given token not valid for any token type'})
+
+                self._send(200, server.get_page(parse_qs(url.query)))
+
+            def _send(self, status, data):
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+
+def _encode_cursor(offset):
+    return base64.b64encode('o={}'.format(offset).encode()).decode()
+
+
+def _decode_cursor(cursor):
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode()[len('o='):])
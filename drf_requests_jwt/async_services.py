@@ -0,0 +1,403 @@
+"""
+Async services.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import aiohttp
+
+from drf_requests_jwt.exceptions import (
+    ConnectionFailedError, HttpRequestServiceError, ObtainJWTError, ResponseStatusError
+)
+from drf_requests_jwt.services import BaseHttpRequestService
+
+logger = logging.getLogger(__name__)
+
+_lock_executor = ThreadPoolExecutor(thread_name_prefix='drf-requests-jwt-lock')
+
+
+class AsyncHttpRequestService(BaseHttpRequestService):
+    """
+    The asyncio counterpart of `HttpRequestService`, implemented by subclasses through the same hooks.
+
+    Use it as an async context manager, so the aiohttp session it creates gets closed:
+
+        async with DeviceAsyncHttpRequestService() as service:
+            async for device in service.iter_results():
+                ...
+    """
+
+    def __init__(self, params=None, session=None):
+        super().__init__(params=params)
+
+        self.session = session
+        self.owns_session = session is None
+        self.authorization_lock = None
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        if self.owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        # The aiohttp session and the lock have to be created with the event loop running.
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+        return self.session
+
+    def _get_authorization_lock(self):
+        if self.authorization_lock is None:
+            self.authorization_lock = asyncio.Lock()
+        return self.authorization_lock
+
+    async def get_results_from_all_pages(self):
+        """
+        Return the results of all the pages, from the first one.
+
+        As none of them is kept before the list is returned, no checkpoint is resumed from nor saved,
+        and the watermark is only saved once the last page is fetched.
+        """
+        results = []
+        watermark = None
+        pages = self._iter_page_links(self.url)
+
+        try:
+            async for page_results, next_link in pages:
+                results.extend(page_results)
+                watermark = self._get_watermark(page_results, watermark)
+
+                if not next_link:
+                    await self._run_in_executor(self._save_watermark, watermark)
+        finally:
+            await pages.aclose()
+
+        return results
+
+    async def iter_results(self):
+        """
+        Yield results one by one, as soon as each page is decoded.
+        """
+        async for results in self.iter_pages():
+            for result in results:
+                yield result
+
+    async def iter_pages(self):
+        """
+        Yield the results list of each page, following the `next` link until the last page.
+
+        With a `checkpoint_backend_class`, the next link and the record count are saved once the consumer
+        asks for the page after, so that a sync which did not finish resumes from there.
+        With a `watermark_backend_class`, the largest `watermark_field` is saved once the last page is done.
+
+        With more than one `page_fetch_workers`, the remaining pages of a page number or limit offset
+        paginated endpoint are fetched concurrently, and still yielded in order.
+        """
+        next_url, record_count = await self._run_in_executor(self._get_checkpoint)
+        watermark = None
+        pages = self._iter_page_links(next_url)
+
+        try:
+            async for results, next_link in pages:
+                yield results
+
+                record_count, watermark = await self._run_in_executor(
+                    self._save_progress, results, next_link, record_count, watermark
+                )
+        finally:
+            await pages.aclose()
+
+    async def _iter_page_links(self, next_url):
+        """
+        Yield the (results, next link) of each page, starting from the `next_url`.
+        """
+        pages_collected = 0
+        responses = self._iter_responses(next_url)
+
+        try:
+            async for response_json in responses:
+                pages_collected += 1
+                yield response_json.get('results', []), response_json.get('next')
+        except HttpRequestServiceError as e:
+            e.pages_collected = pages_collected
+            raise
+        finally:
+            # Unlike a sync generator, an async one is only closed by the event loop, late, unless closed here.
+            await responses.aclose()
+
+    async def _iter_responses(self, next_url):
+        """
+        Yield the decoded json of each page, starting from the `next_url`.
+        """
+        is_first_page = True
+        page_size = self.page_size_policy.get_first_page_size()
+
+        while next_url:
+            url, params = self._get_next_request(next_url, page_size)
+
+            response_json = await self._get_page(url, params)
+
+            if response_json is None:
+                break
+
+            next_url = response_json.get('next')
+            page_size = self._get_next_page_size(page_size, response_json)
+            yield response_json
+
+            if is_first_page and self.page_fetch_workers > 1:
+                remaining_pages = self._get_remaining_pages(response_json)
+
+                if remaining_pages:
+                    concurrent_responses = self._iter_concurrent_pages(remaining_pages)
+                    try:
+                        async for response_json in concurrent_responses:
+                            yield response_json
+                    finally:
+                        await concurrent_responses.aclose()
+                    break
+
+            is_first_page = False
+
+    async def _get_page(self, url, params):
+        """
+        Request one page and return its decoded json, or None when no valid JWT token could be obtained.
+        """
+        with self.instrumentation.span('page', url=url):
+            return await self._request_page(url, params)
+
+    async def _request_page(self, url, params):
+        response_cache_backend = self._get_response_cache_backend(url, params)
+        cached_response = None
+        if response_cache_backend is not None:
+            cached_response = await self._run_in_executor(response_cache_backend.get)
+        # Only the attempts retried count, not those the authorization header is updated after.
+        attempt = 1
+
+        while True:
+            await self._update_expiring_authorization_header()
+
+            authorization = self.headers.get('Authorization')
+            headers = self._get_conditional_headers(cached_response)
+
+            try:
+                await self._wait_for_rate_limit()
+
+                started_at = time.monotonic()
+                async with self._get_session().get(url, headers=headers, params=_get_query(params)) as response:
+                    logger.debug('Request url: %s with params %s', url, params)
+
+                    if response.status == 200:
+                        content = await response.read()
+                        response_json = self._decode_page(content, time.monotonic() - started_at)
+                        if response_cache_backend is not None:
+                            await self._run_in_executor(
+                                self._cache_response, response_cache_backend, response.headers, response_json
+                            )
+                        return response_json
+                    elif response.status == 304 and cached_response:
+                        return self._get_cached_page(cached_response)
+
+                    status_code = response.status
+                    retry_after = response.headers.get('Retry-After')
+                    content = await response.read()
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if not self.retry_policy.should_retry(attempt):
+                    raise ConnectionFailedError('Request to {} failed: {}'.format(url, e)) from e
+
+                logger.warning('Request url: %s failed, retrying: %s', url, e)
+                self.instrumentation.increment('page_retries')
+                await asyncio.sleep(self.retry_policy.get_delay(attempt))
+                attempt += 1
+                continue
+
+            if status_code == 401:
+                self.instrumentation.increment('unauthorized_responses')
+                if not await self._update_stale_authorization_header(authorization):
+                    return None
+            elif self.retry_policy.should_retry(attempt, status_code, retry_after):
+                logger.warning('Request url: %s got status code %s, retrying', url, status_code)
+                self.instrumentation.increment('page_retries')
+                await asyncio.sleep(self.retry_policy.get_delay(attempt, retry_after))
+                attempt += 1
+            else:
+                raise ResponseStatusError(status_code, content)
+
+    async def _wait_for_rate_limit(self):
+        if self.rate_limit_backend is None:
+            return
+
+        delay = await self._run_in_executor(self._reserve_rate_limit)
+
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _run_in_executor(self, func, *args):
+        """
+        Call a backend off the event loop, the shared ones go through the network.
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _update_stale_authorization_header(self, authorization):
+        """
+        Update the authorization header only if no other task did it since the `authorization` was sent.
+        """
+        async with self._get_authorization_lock():
+            if self.headers.get('Authorization') != authorization:
+                return True
+
+            if not self._should_update_authorization_header():
+                return False
+
+            await self.update_authorization_header()
+            return True
+
+    async def _update_expiring_authorization_header(self):
+        """
+        Update the authorization header before the token expires, instead of waiting for a 401.
+        """
+        if not self._is_authorization_header_expiring():
+            return
+
+        async with self._get_authorization_lock():
+            if self._is_authorization_header_expiring() and self._should_update_authorization_header():
+                await self.update_authorization_header()
+
+    async def _iter_concurrent_pages(self, pages):
+        """
+        Fetch the pages as concurrent tasks, keeping at most `page_fetch_workers` pages in flight.
+        """
+        pages = iter(pages)
+        tasks = deque()
+
+        try:
+            for url, params in itertools.islice(pages, self.page_fetch_workers):
+                tasks.append(asyncio.ensure_future(self._get_page(url, params)))
+
+            while tasks:
+                response_json = await tasks.popleft()
+
+                for url, params in itertools.islice(pages, 1):
+                    tasks.append(asyncio.ensure_future(self._get_page(url, params)))
+
+                if response_json is None:
+                    break
+
+                yield response_json
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # Wait for the cancelled tasks, retrieving their errors, so that none is destroyed while pending.
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def update_authorization_header(self):
+        token = await self._get_jwt_token()
+        self.headers['Authorization'] = 'Bearer {token}'.format(token=token)
+
+    async def _get_jwt_token(self):
+        """
+        Obtain a token holding the cache backend lock, so that only one caller per cache key logs in at a time.
+        """
+        stale_token = self._get_authorization_token()
+        lock = self.cache_backend.lock()
+        await self._acquire_backend_lock(lock)
+
+        try:
+            token = await self._run_in_executor(self._get_fresh_jwt_token_from_cache, stale_token)
+
+            if token is None:
+                with self.instrumentation.span('login'):
+                    token = await self._obtain_jwt_token()
+        finally:
+            # Shielded, a release cancelled before it runs would leave the lock held.
+            await asyncio.shield(self._run_in_executor(lock.__exit__, None, None, None))
+
+        return token
+
+    async def _acquire_backend_lock(self, lock):
+        """
+        Wait for the blocking backend lock in a thread of its own pool, so that the waiters never take
+        the threads the holder needs to obtain the token and release it.
+        """
+        acquiring = asyncio.get_running_loop().run_in_executor(_lock_executor, lock.__enter__)
+
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            # The thread still takes the lock, it has to give it back once it does.
+            acquiring.add_done_callback(lambda future: _release_backend_lock(future, lock))
+            raise
+
+    async def _obtain_jwt_token(self):
+        await self._run_in_executor(self._load_jwt_refresh_token)
+
+        if self._should_refresh_jwt_token():
+            token = await self._refresh_jwt_token()
+            if token is not None:
+                return token
+
+        payload = {
+            'username': self._get_username(),
+            'password': self._get_password()
+        }
+        url = self._get_jwt_login_url()
+        logger.debug('Request url: %s', url)
+        await self._wait_for_rate_limit()
+
+        async with self._get_session().post(url, data=payload) as response:
+            if response.status == 200:
+                self.instrumentation.increment('logins', outcome='success')
+                response_dict = self.json_codec.loads(await response.read())
+                return await self._run_in_executor(self._receive_jwt_token, response_dict)
+            else:
+                self.obtain_jwt_fail_attempts += 1
+                self.instrumentation.increment('logins', outcome='failure')
+                logger.warning('Attempt to get a JWT token failed')
+                raise ObtainJWTError(response.status, await response.read())
+
+    async def _refresh_jwt_token(self):
+        """
+        Get a new access token from the refresh endpoint, or None so that the caller logs in again.
+        """
+        url = self._get_jwt_refresh_url()
+        logger.debug('Request url: %s', url)
+        await self._wait_for_rate_limit()
+
+        async with self._get_session().post(url, data={'refresh': self.jwt_refresh_token}) as response:
+            if response.status == 200:
+                self.instrumentation.increment('token_refreshes', outcome='success')
+                response_dict = self.json_codec.loads(await response.read())
+                return await self._run_in_executor(self._receive_jwt_token, response_dict)
+
+        self.instrumentation.increment('token_refreshes', outcome='failure')
+        logger.warning('Attempt to refresh the JWT token failed')
+        self.jwt_refresh_token = None
+        return None
+
+
+def _release_backend_lock(future, lock):
+    if not future.cancelled() and future.exception() is None:
+        _lock_executor.submit(lock.__exit__, None, None, None)
+
+
+def _get_query(params):
+    """
+    Flatten the params into (key, value) pairs, aiohttp does not accept lists as values.
+    """
+    query = []
+    for key, value in params.items():
+        if isinstance(value, (list, tuple)):
+            query.extend((key, str(item)) for item in value)
+        else:
+            query.append((key, str(value)))
+    return query
@@ -1,5 +1,13 @@
+import threading
+import time
+
 from slugify import slugify
 
+from drf_requests_jwt import settings
+
+_thread_locks = {}
+_thread_locks_lock = threading.Lock()
+
 
 class BaseBackend(object):
     def __init__(self, key):
@@ -10,3 +18,98 @@ class BaseBackend(object):
 
     def set_jwt(self, token):
         raise NotImplementedError
+
+    def get_refresh_jwt(self):
+        return self._get_refresh_backend().get_jwt()
+
+    def set_refresh_jwt(self, token):
+        """
+        Cache the refresh token next to the access token, until its own expiry.
+        """
+        self._get_refresh_backend().set_jwt(token)
+
+    def _get_refresh_backend(self):
+        return self.__class__('{key}-refresh'.format(key=self.key))
+
+    @classmethod
+    def get_many(cls, keys):
+        """
+        Return the tokens cached for each of the keys, None for the missing ones.
+        """
+        return {key: cls(key).get_jwt() for key in keys}
+
+    @classmethod
+    def set_many(cls, tokens):
+        """
+        Cache each of the tokens under its key.
+        """
+        for key, token in tokens.items():
+            cls(key).set_jwt(token)
+
+    def lock(self):
+        """
+        Return a context manager held by only one caller at a time for this key, while it obtains a token.
+        """
+        return self._get_thread_lock()
+
+    def _get_thread_lock(self):
+        with _thread_locks_lock:
+            return _thread_locks.setdefault(self.key, threading.Lock())
+
+
+class BaseStoreBackend(object):
+    """
+    Keep one json serializable value under a key, like the checkpoint of a service.
+    """
+
+    def __init__(self, key):
+        self.key = slugify(key)
+
+    def get(self):
+        raise NotImplementedError
+
+    def set(self, value):
+        raise NotImplementedError
+
+    def delete(self):
+        raise NotImplementedError
+
+
+class BaseRateLimitBackend(object):
+    """
+    Let `rate` requests per second through for a key, after bursts of up to `burst` requests.
+    """
+    rate = settings.DEFAULTS.get('RATE_LIMIT_RATE')
+    burst = settings.DEFAULTS.get('RATE_LIMIT_BURST')
+
+    def __init__(self, key):
+        self.key = slugify(key)
+
+    def acquire(self):
+        """
+        Wait until the request is allowed.
+        """
+        delay = self.reserve()
+
+        if delay > 0:
+            time.sleep(delay)
+
+        return delay
+
+    def reserve(self):
+        """
+        Take the next request slot, and return the seconds to wait for it.
+        """
+        raise NotImplementedError
+
+    def _get_arrival_time(self, arrival_time, now):
+        """
+        Return the arrival time after one more request, and the seconds that request has to wait.
+
+        It is a token bucket, kept as the generic cell rate algorithm does, with the single time
+        the bucket gets full again, the arrival time.
+        """
+        interval = 1 / self.rate
+        arrival_time = max(arrival_time or now, now) + interval
+
+        return arrival_time, arrival_time - self.burst * interval - now
@@ -1,11 +1,130 @@
-from django.core.cache import cache
+import math
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
 
-from drf_requests_jwt.backends.base import BaseBackend
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from slugify import slugify
+
+from drf_requests_jwt import settings
+from drf_requests_jwt.backends.base import BaseBackend, BaseRateLimitBackend, BaseStoreBackend
+from drf_requests_jwt.tokens import get_jwt_expiry
 
 
 class DjangoCacheBackend(BaseBackend):
+    """
+    Keep the token in the `cache_alias` Django cache, until its expiry.
+    """
+    cache_alias = settings.DEFAULTS.get('DJANGO_CACHE_ALIAS')
+    lock_timeout = 30
+    lock_poll_interval = 0.05
+
+    @classmethod
+    def get_cache(cls):
+        return caches[cls.cache_alias]
+
     def get_jwt(self):
-        return cache.get(self.key)
+        return self.get_cache().get(self.key)
 
     def set_jwt(self, token):
-        cache.set(self.key, token)
+        self.get_cache().set(self.key, token, self._get_timeout(token))
+
+    @classmethod
+    def get_many(cls, keys):
+        slugs = {key: slugify(key) for key in keys}
+        tokens = cls.get_cache().get_many(list(slugs.values()))
+        return {key: tokens.get(slug) for key, slug in slugs.items()}
+
+    @classmethod
+    def set_many(cls, tokens):
+        # A round trip takes a single timeout, one per group of tokens expiring at the same time.
+        tokens_by_timeout = defaultdict(dict)
+        for key, token in tokens.items():
+            tokens_by_timeout[cls._get_timeout(token)][slugify(key)] = token
+
+        for timeout, timeout_tokens in tokens_by_timeout.items():
+            cls.get_cache().set_many(timeout_tokens, timeout)
+
+    @staticmethod
+    def _get_timeout(token):
+        expiry = get_jwt_expiry(token)
+
+        if expiry is None:
+            return DEFAULT_TIMEOUT
+        return max(int(expiry - time.time()), 0)
+
+    @contextmanager
+    def lock(self):
+        # `cache.add` only succeeds for one caller across processes, the lock expires if its holder dies.
+        cache = self.get_cache()
+        lock_key = '{key}-lock'.format(key=self.key)
+        lock_value = uuid.uuid4().hex
+
+        with self._get_thread_lock():
+            while not cache.add(lock_key, lock_value, self.lock_timeout):
+                time.sleep(self.lock_poll_interval)
+
+            try:
+                yield
+            finally:
+                if cache.get(lock_key) == lock_value:
+                    cache.delete(lock_key)
+
+
+class DjangoCacheStoreBackend(BaseStoreBackend):
+    """
+    Keep the value in the `cache_alias` Django cache, for `timeout` seconds, forever by default.
+    """
+    cache_alias = settings.DEFAULTS.get('DJANGO_CACHE_ALIAS')
+    timeout = None
+
+    @classmethod
+    def get_cache(cls):
+        return caches[cls.cache_alias]
+
+    def get(self):
+        return self.get_cache().get(self.key)
+
+    def set(self, value):
+        self.get_cache().set(self.key, value, self.timeout)
+
+    def delete(self):
+        self.get_cache().delete(self.key)
+
+
+class DjangoCacheRateLimitBackend(BaseRateLimitBackend):
+    """
+    Share the rate limit between all the processes using the `cache_alias` Django cache.
+
+    The arrival time of the token bucket is kept in the cache, and updated under a `cache.add` lock,
+    so it is only shared safely with the caches whose `add` is atomic, like the Redis and Memcached ones.
+    """
+    cache_alias = settings.DEFAULTS.get('DJANGO_CACHE_ALIAS')
+    lock_timeout = 5
+    lock_poll_interval = 0.005
+
+    @classmethod
+    def get_cache(cls):
+        return caches[cls.cache_alias]
+
+    def reserve(self):
+        cache = self.get_cache()
+        lock_key = '{key}-lock'.format(key=self.key)
+        lock_value = uuid.uuid4().hex
+
+        while not cache.add(lock_key, lock_value, self.lock_timeout):
+            time.sleep(self.lock_poll_interval)
+
+        try:
+            now = time.time()
+            arrival_time, delay = self._get_arrival_time(cache.get(self.key), now)
+
+            # Once the arrival time is past, the bucket is full, as if it was never set.
+            cache.set(self.key, arrival_time, math.ceil(arrival_time - now) + 1)
+        finally:
+            if cache.get(lock_key) == lock_value:
+                cache.delete(lock_key)
+
+        return max(delay, 0)
@@ -1,20 +1,118 @@
-from pathlib import Path
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
 
-from drf_requests_jwt.backends.base import BaseBackend
+from drf_requests_jwt import settings
+from drf_requests_jwt.backends.base import BaseBackend, BaseStoreBackend
+from drf_requests_jwt.tokens import get_jwt_expiry
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
 
 class FileCacheBackend(BaseBackend):
+    """
+    Keep the token in a `cache_dir` file, along with its expiry, so that an expired token is never loaded.
+    """
+    cache_dir = settings.DEFAULTS.get('FILE_CACHE_DIR')
+
     def __init__(self, key):
         super().__init__(key)
 
-        self.file_path = '/tmp/{key}'.format(key=self.key)
+        self.file_path = os.path.join(self.cache_dir, self.key)
+        self.lock_file_path = '{file_path}.lock'.format(file_path=self.file_path)
 
     def get_jwt(self):
-        if Path(self.file_path).is_file():
+        try:
             with open(self.file_path, 'r') as f:
-                return f.read()
-        return None
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        expiry, separator, token = content.partition('\n')
+
+        if not separator:
+            # Written without the expiry line, by a previous version.
+            return content or None
+
+        try:
+            if expiry and float(expiry) <= time.time():
+                return None
+        except ValueError:
+            return None
+
+        return token or None
 
     def set_jwt(self, token):
-        with open(self.file_path, 'w') as f:
-            f.write(token)
+        expiry = get_jwt_expiry(token)
+
+        _write_atomically(self.file_path, '{expiry}\n{token}'.format(
+            expiry='' if expiry is None else expiry,
+            token=token
+        ))
+
+    @contextmanager
+    def lock(self):
+        # The thread lock keeps the threads of this process off the file lock, which serializes the processes.
+        with self._get_thread_lock():
+            if fcntl is None:
+                yield
+                return
+
+            with open(self.lock_file_path, 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class FileStoreBackend(BaseStoreBackend):
+    """
+    Keep the value as json in a `cache_dir` file.
+    """
+    cache_dir = settings.DEFAULTS.get('FILE_CACHE_DIR')
+
+    def __init__(self, key):
+        super().__init__(key)
+
+        self.file_path = os.path.join(self.cache_dir, self.key)
+
+    def get(self):
+        try:
+            with open(self.file_path, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def set(self, value):
+        _write_atomically(self.file_path, json.dumps(value))
+
+    def delete(self):
+        try:
+            os.unlink(self.file_path)
+        except FileNotFoundError:
+            pass
+
+
+def _write_atomically(file_path, content):
+    """
+    Write a temporary file next to `file_path`, then rename it, so that readers never see a partial content.
+    """
+    directory, name = os.path.split(file_path)
+    fd, temp_file_path = tempfile.mkstemp(dir=directory, prefix='.{name}.'.format(name=name))
+
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write(content)
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_file_path)
+        except FileNotFoundError:
+            pass
+        raise
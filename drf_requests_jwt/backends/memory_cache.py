@@ -0,0 +1,127 @@
+import threading
+import time
+from contextlib import contextmanager
+
+from slugify import slugify
+
+from drf_requests_jwt import settings
+from drf_requests_jwt.backends.base import BaseBackend, BaseRateLimitBackend
+from drf_requests_jwt.tokens import get_jwt_expiry
+
+_tokens = {}
+_tokens_lock = threading.Lock()
+
+_arrival_times = {}
+_arrival_times_lock = threading.Lock()
+
+
+class MemoryCacheBackend(BaseBackend):
+    """
+    Keep the tokens in the process memory until they expire, in front of the `wrapped_backend_class`.
+
+    Set `wrapped_backend_class` to None to keep the tokens in memory only.
+    """
+    wrapped_backend_class = settings.DEFAULTS.get('CACHE_BACKEND_CLASS')
+
+    def __init__(self, key):
+        super().__init__(key)
+
+        self.wrapped_backend = self._get_wrapped_backend(key)
+
+    @classmethod
+    def _get_wrapped_backend_class(cls):
+        if cls.wrapped_backend_class is None:
+            return None
+        return settings.import_from_string(cls.wrapped_backend_class)
+
+    def _get_wrapped_backend(self, key):
+        resolved_backend_class = self._get_wrapped_backend_class()
+        return resolved_backend_class(key) if resolved_backend_class is not None else None
+
+    def get_jwt(self):
+        token = _recall(self.key)
+
+        if token is not None or self.wrapped_backend is None:
+            return token
+
+        token = self.wrapped_backend.get_jwt()
+
+        if token:
+            _remember(self.key, token)
+        else:
+            _forget(self.key)
+
+        return token
+
+    def set_jwt(self, token):
+        if self.wrapped_backend is not None:
+            self.wrapped_backend.set_jwt(token)
+
+        _remember(self.key, token)
+
+    @classmethod
+    def get_many(cls, keys):
+        tokens = {key: _recall(slugify(key)) for key in keys}
+        missing_keys = [key for key, token in tokens.items() if token is None]
+        resolved_backend_class = cls._get_wrapped_backend_class()
+
+        if missing_keys and resolved_backend_class is not None:
+            for key, token in resolved_backend_class.get_many(missing_keys).items():
+                if token:
+                    _remember(slugify(key), token)
+                    tokens[key] = token
+
+        return tokens
+
+    @classmethod
+    def set_many(cls, tokens):
+        resolved_backend_class = cls._get_wrapped_backend_class()
+
+        if resolved_backend_class is not None:
+            resolved_backend_class.set_many(tokens)
+
+        for key, token in tokens.items():
+            _remember(slugify(key), token)
+
+    @contextmanager
+    def lock(self):
+        # Whoever holds the lock is about to replace a token, it has to read the one other processes
+        # may have obtained meanwhile from the wrapped backend, not the one remembered here.
+        lock = self.wrapped_backend.lock() if self.wrapped_backend is not None else super().lock()
+
+        with lock:
+            if self.wrapped_backend is not None:
+                _forget(self.key)
+            yield
+
+
+class MemoryRateLimitBackend(BaseRateLimitBackend):
+    """
+    Share the rate limit between the threads of the process.
+    """
+
+    def reserve(self):
+        with _arrival_times_lock:
+            arrival_time, delay = self._get_arrival_time(_arrival_times.get(self.key), time.time())
+            _arrival_times[self.key] = arrival_time
+
+        return delay
+
+
+def _recall(key):
+    with _tokens_lock:
+        token, expiry = _tokens.get(key, (None, None))
+
+    if token is not None and (expiry is None or expiry > time.time()):
+        return token
+    return None
+
+
+def _remember(key, token):
+    with _tokens_lock:
+        _tokens[key] = (token, get_jwt_expiry(token))
+
+
+def _forget(key):
+    with _tokens_lock:
+        _tokens.pop(key, None)
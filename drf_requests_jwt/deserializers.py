@@ -1,7 +1,16 @@
 """
 Deserializers.
 """
+import contextlib
+import itertools
 import logging
+import math
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from drf_requests_jwt import settings
+from drf_requests_jwt.iterators import iter_prefetched
 
 logger = logging.getLogger(__name__)
 
@@ -9,18 +18,378 @@ logger = logging.getLogger(__name__)
 class ObjectListDeserializerMixin(object):
     serializer_class = None
 
+    # With a batch size, the valid records are saved with `bulk_create` in batches, instead of one `save()` each.
+    # With a lookup field, the records matching existing instances on it are saved with `bulk_update` instead.
+    bulk_batch_size = settings.DEFAULTS.get('BULK_BATCH_SIZE')
+    bulk_lookup_field = None
+    bulk_update_fields = None
+
+    # The pipeline deserializes chunks of records while a thread fetches up to `pipeline_queue_size` pages ahead.
+    pipeline_chunk_size = settings.DEFAULTS.get('PIPELINE_CHUNK_SIZE')
+    pipeline_queue_size = settings.DEFAULTS.get('PIPELINE_QUEUE_SIZE')
+
+    # With more than one validation worker, the records are validated in a process pool, and saved in this process.
+    validation_workers = settings.DEFAULTS.get('VALIDATION_WORKERS')
+    validation_executor = None
+
+    # Set by the service, or created out of the `instrumentation_class` when the mixin is used on its own.
+    instrumentation_class = settings.DEFAULTS.get('INSTRUMENTATION_CLASS')
+    instrumentation = None
+
+    # With `fields_from_serializer`, the service `fields` default to the writable fields of the `serializer_class`.
+    # The records are stripped down to the fields before they are validated.
+    fields = None
+    fields_from_serializer = settings.DEFAULTS.get('FIELDS_FROM_SERIALIZER')
+
     def get_deserialized_object_list(self):
+        self._check_serializer_class()
+
         object_list = []
 
+        with self._validation_pool():
+            for chunk_object_list in self._iter_checkpointed_chunks(self.bulk_batch_size or self.pipeline_chunk_size):
+                object_list.extend(chunk_object_list)
+
+        return object_list
+
+    def iter_deserialized_chunks(self):
+        """
+        Yield lists of up to `pipeline_chunk_size` deserialized objects, validating and saving each chunk
+        while the next pages are being fetched.
+        """
+        self._check_serializer_class()
+
+        with self._validation_pool():
+            yield from self._iter_checkpointed_chunks(self.pipeline_chunk_size, self.pipeline_queue_size)
+
+    def iter_deserialized_objects(self):
+        for chunk in self.iter_deserialized_chunks():
+            yield from chunk
+
+    def _check_serializer_class(self):
+        self.deserialization_errors = []
+
+        if self.instrumentation is None:
+            self.instrumentation = settings.import_from_string(self.instrumentation_class)(self.__class__.__name__)
+
         if self.serializer_class is None:
             raise Exception('`serializer_class` is required')
 
-        for object_json in self.get_results_from_all_pages():
-            logger.debug("Serializing {}".format(object_json))
+        self.projected_fields = self._get_fields()
+
+    def _get_fields(self):
+        if self.fields is None and self.fields_from_serializer and self.serializer_class is not None:
+            return [name for name, field in self.serializer_class().fields.items() if not field.read_only]
+
+        return self.fields
+
+    def _iter_checkpointed_chunks(self, size, queue_size=None):
+        """
+        Yield the deserialized objects of chunks of up to `size` records, saving the progress of the sync
+        only once all the records of a page are saved, so that a sync resuming from its checkpoint misses none.
+
+        With a `queue_size`, a thread fetches up to that many pages ahead.
+        """
+        next_url, record_count = self._get_checkpoint()
+        watermark = None
+
+        pages = self._iter_page_links(next_url)
+        if queue_size:
+            pages = iter_prefetched(pages, queue_size)
+
+        for chunk, completed_pages in _iter_page_chunks(pages, size):
+            object_list = self._deserialize_chunk(chunk) if chunk else []
+
+            for results, next_link in completed_pages:
+                record_count, watermark = self._save_progress(results, next_link, record_count, watermark)
+
+            if chunk:
+                yield object_list
+
+    @contextlib.contextmanager
+    def _validation_pool(self):
+        if self.validation_workers <= 1:
+            yield
+            return
+
+        if self._in_atomic_block():
+            # Closing its connection would break the atomic block of the caller, and drop its on_commit hooks.
+            logger.warning('Validating in the calling process, which is in an atomic block')
+            yield
+            return
+
+        # The workers are forked on the first validation, without the database connections of this process.
+        self._close_db_connections()
+
+        with ProcessPoolExecutor(
+                max_workers=self.validation_workers, mp_context=multiprocessing.get_context('fork')) as executor:
+            # Fork the workers before the pipeline starts its fetch thread, forking a busy thread can deadlock them.
+            executor.submit(int).result()
+
+            self.validation_executor = executor
+            try:
+                yield
+            finally:
+                self.validation_executor = None
+
+    def _deserialize_chunk(self, records):
+        records = _project_records(records, self.projected_fields)
+
+        if self.bulk_batch_size:
+            return self._bulk_deserialize(records)
+        elif self.validation_executor is not None:
+            return self._parallel_deserialize(records)
+
+        object_list = []
+        validation_seconds = 0
+
+        for object_json in records:
+            logger.debug('Serializing %s', object_json)
             serializer = self.serializer_class(data=object_json)
-            if serializer.is_valid():
+
+            started_at = time.perf_counter()
+            is_valid = serializer.is_valid()
+            validation_seconds += time.perf_counter() - started_at
+
+            if is_valid:
                 object_list.append(serializer.save())
             else:
-                logger.warning("Serializer has errors {}".format(serializer.errors))
+                self._add_deserialization_error(object_json, serializer.errors)
 
+        self._observe_validation(records, validation_seconds)
         return object_list
+
+    def _parallel_deserialize(self, records):
+        object_list = []
+
+        for object_json, validated_data, errors in self._validate(records):
+            if errors:
+                self._add_deserialization_error(object_json, errors)
+            else:
+                object_list.append(self._save_validated_data(object_json, validated_data))
+
+        return object_list
+
+    def _bulk_deserialize(self, records):
+        validated_data_list = []
+
+        for object_json, validated_data, errors in self._validate(records):
+            if errors:
+                self._add_deserialization_error(object_json, errors)
+            else:
+                validated_data_list.append(validated_data)
+
+        return self._bulk_save(validated_data_list)
+
+    def _validate(self, records):
+        """
+        Return the (record, validated data, errors) of each record in order, splitting them across the workers.
+        """
+        started_at = time.perf_counter()
+
+        lookup_field = self._get_bulk_update_lookup_field()
+
+        if self.validation_executor is None:
+            validated_records = _validate_records(self.serializer_class, records, lookup_field)
+        else:
+            size = max(1, math.ceil(len(records) / self.validation_workers))
+            results = self.validation_executor.map(
+                _validate_records, itertools.repeat(self.serializer_class), _iter_chunks(records, size),
+                itertools.repeat(lookup_field)
+            )
+            validated_records = list(itertools.chain.from_iterable(results))
+
+        self._observe_validation(records, time.perf_counter() - started_at)
+        return validated_records
+
+    def _get_bulk_update_lookup_field(self):
+        """
+        Return the field matching the records to the existing instances in the bulk mode, if any.
+        """
+        return self.bulk_lookup_field if self.bulk_batch_size else None
+
+    def _observe_validation(self, records, seconds):
+        self.instrumentation.observe('validation_seconds', seconds)
+        self.instrumentation.increment('records_validated', len(records))
+
+    def _save_validated_data(self, object_json, validated_data):
+        """
+        Save the data validated in a worker with `serializer.save()`, as if the serializer had validated it.
+        """
+        serializer = self.serializer_class(data=object_json)
+        serializer._validated_data = validated_data
+        serializer._errors = {}
+        return serializer.save()
+
+    def _bulk_save(self, validated_data_list):
+        """
+        Save the batch in a transaction, creating the new instances and updating the existing ones.
+        """
+        instances = [self._build_instance(validated_data) for validated_data in validated_data_list]
+
+        if not instances:
+            return []
+
+        manager = self._get_model()._default_manager
+
+        with self._atomic():
+            if self.bulk_lookup_field is None:
+                return manager.bulk_create(instances, batch_size=self.bulk_batch_size)
+
+            lookups = [getattr(instance, self.bulk_lookup_field) for instance in instances]
+            existing_instances = manager.in_bulk(lookups, field_name=self.bulk_lookup_field)
+
+            instances_to_create = []
+            instances_to_update = []
+            for instance in instances:
+                existing_instance = existing_instances.get(getattr(instance, self.bulk_lookup_field))
+
+                if existing_instance is None:
+                    instances_to_create.append(instance)
+                else:
+                    instance.pk = existing_instance.pk
+                    instances_to_update.append(instance)
+
+            if instances_to_create:
+                manager.bulk_create(instances_to_create, batch_size=self.bulk_batch_size)
+            if instances_to_update:
+                update_fields = self._get_bulk_update_fields(validated_data_list)
+                manager.bulk_update(instances_to_update, update_fields, batch_size=self.bulk_batch_size)
+
+        return instances
+
+    def _get_model(self):
+        return self.serializer_class.Meta.model
+
+    def _build_instance(self, validated_data):
+        """
+        Return an unsaved instance out of the validated data, override it for serializers with nested data.
+        """
+        return self._get_model()(**validated_data)
+
+    def _get_bulk_update_fields(self, validated_data_list):
+        if self.bulk_update_fields is not None:
+            return self.bulk_update_fields
+
+        fields = set(itertools.chain.from_iterable(validated_data_list))
+        fields.discard(self.bulk_lookup_field)
+        return sorted(fields)
+
+    def _atomic(self):
+        # Django is only required by the bulk mode.
+        from django.db import transaction
+
+        return transaction.atomic()
+
+    def _in_atomic_block(self):
+        try:
+            from django.db import connections
+        except ImportError:
+            return False
+
+        return any(connection.in_atomic_block for connection in connections.all())
+
+    def _close_db_connections(self):
+        try:
+            from django.db import connections
+        except ImportError:
+            return
+
+        connections.close_all()
+
+    def _add_deserialization_error(self, object_json, errors):
+        logger.warning('Serializer has errors %s', errors)
+        self.instrumentation.increment('records_invalid')
+        self.deserialization_errors.append({'data': object_json, 'errors': errors})
+
+
+def _validate_records(serializer_class, records, lookup_field=None):
+    """
+    Validate each record with a serializer of its own, return the (record, validated data, errors) of each.
+
+    With a `lookup_field`, the records matching existing instances on it are updated, not rejected,
+    so its uniqueness validators are dropped, along with their query per record.
+    """
+    validated_records = []
+
+    for object_json in records:
+        serializer = serializer_class(data=object_json)
+
+        if lookup_field is not None:
+            _drop_unique_validators(serializer, lookup_field)
+
+        if serializer.is_valid():
+            validated_records.append((object_json, serializer.validated_data, None))
+        else:
+            validated_records.append((object_json, None, serializer.errors))
+
+    return validated_records
+
+
+def _drop_unique_validators(serializer, field_name):
+    from rest_framework.validators import UniqueTogetherValidator, UniqueValidator
+
+    field = serializer.fields.get(field_name)
+    if field is not None:
+        field.validators = [validator for validator in field.validators if not isinstance(validator, UniqueValidator)]
+
+    serializer.validators = [
+        validator for validator in serializer.validators
+        if not (isinstance(validator, UniqueTogetherValidator) and field_name in validator.fields)
+    ]
+
+
+def _project_records(records, fields):
+    """
+    Strip the records down to the `fields`, if any, in case the API point sent more.
+    """
+    if not fields:
+        return records
+
+    return [
+        {name: record[name] for name in fields if name in record} if isinstance(record, dict) else record
+        for record in records
+    ]
+
+
+def _iter_page_chunks(pages, size):
+    """
+    Split the records of the (results, next link) pages into chunks of `size`,
+    yielding each chunk along with the pages whose last record it holds.
+    """
+    chunk = []
+    completed_pages = []
+
+    for page in pages:
+        results = page[0]
+        start = 0
+
+        while len(chunk) + len(results) - start >= size:
+            end = start + size - len(chunk)
+            chunk.extend(results[start:end])
+            start = end
+
+            if start == len(results):
+                completed_pages.append(page)
+
+            yield chunk, completed_pages
+            chunk, completed_pages = [], []
+
+        if start < len(results) or not results:
+            chunk.extend(results[start:])
+            completed_pages.append(page)
+
+    if chunk or completed_pages:
+        yield chunk, completed_pages
+
+
+def _iter_chunks(iterable, size):
+    iterator = iter(iterable)
+
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield chunk
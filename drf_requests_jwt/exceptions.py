@@ -0,0 +1,41 @@
+"""
+Exceptions.
+"""
+
+
+class HttpRequestServiceError(Exception):
+    """
+    Base of the service errors, `pages_collected` tells how many pages were fetched before it.
+    """
+
+    def __init__(self, message, pages_collected=0):
+        super().__init__(message)
+
+        self.pages_collected = pages_collected
+
+
+class ResponseStatusError(HttpRequestServiceError):
+    """
+    A request got a status code which was neither expected nor retried.
+    """
+
+    def __init__(self, status_code, content, pages_collected=0):
+        super().__init__('Wrong response status code: {code}, content: {content}'.format(
+            code=status_code,
+            content=content
+        ), pages_collected=pages_collected)
+
+        self.status_code = status_code
+        self.content = content
+
+
+class ObtainJWTError(ResponseStatusError):
+    """
+    The JWT login endpoint refused the credentials.
+    """
+
+
+class ConnectionFailedError(HttpRequestServiceError):
+    """
+    A request kept failing to connect or timing out, after all the retries.
+    """
@@ -0,0 +1,110 @@
+"""
+Exports.
+"""
+import gzip
+import os
+import stat
+import tempfile
+from contextlib import ExitStack, contextmanager
+
+from drf_requests_jwt.json_codecs import DefaultJsonCodec
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+JSON = 'json'
+JSON_LINES = 'jsonl'
+
+GZIP = 'gzip'
+ZSTD = 'zstd'
+
+
+@contextmanager
+def open_export_file(file_path, compression=None):
+    """
+    Open a binary file writing to a temporary file next to `file_path`, renamed to it only once the writing is done,
+    so that readers never see a partial export.
+    """
+    if compression not in (None, GZIP, ZSTD):
+        raise ValueError('Unknown compression {}'.format(compression))
+    if compression == ZSTD and zstandard is None:
+        raise ValueError('The zstd compression requires the zstandard package')
+
+    directory, name = os.path.split(os.path.abspath(file_path))
+    fd, temp_file_path = tempfile.mkstemp(dir=directory, prefix='.{name}.'.format(name=name))
+
+    try:
+        # The temporary file is only readable by its owner, the export gets the mode a new file would have.
+        os.chmod(temp_file_path, _get_export_file_mode(file_path))
+
+        with ExitStack() as stack:
+            output = stack.enter_context(os.fdopen(fd, 'wb'))
+
+            if compression == GZIP:
+                output = stack.enter_context(gzip.GzipFile(fileobj=output, mode='wb'))
+            elif compression == ZSTD:
+                output = stack.enter_context(zstandard.ZstdCompressor().stream_writer(output, closefd=False))
+
+            yield output
+
+        os.replace(temp_file_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(temp_file_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _get_export_file_mode(file_path):
+    """
+    Return the mode of the file the export replaces, or the one `open` would give to a new file.
+    """
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except FileNotFoundError:
+        pass
+
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def write_pages(output, pages, format=JSON, codec=None):
+    """
+    Write the results of each page as soon as it arrives, as a json array or as json lines, return the count.
+    """
+    codec = codec or DefaultJsonCodec()
+
+    if format == JSON:
+        return _write_json_array(output, pages, codec)
+    elif format == JSON_LINES:
+        return _write_json_lines(output, pages, codec)
+
+    raise ValueError('Unknown format {}'.format(format))
+
+
+def _write_json_array(output, pages, codec):
+    count = 0
+    output.write(b'[')
+
+    for results in pages:
+        for result in results:
+            output.write(b',\n' if count else b'\n')
+            output.write(codec.dumps(result))
+            count += 1
+
+    output.write(b'\n]\n' if count else b']\n')
+    return count
+
+
+def _write_json_lines(output, pages, codec):
+    count = 0
+
+    for results in pages:
+        output.writelines(codec.dumps(result) + b'\n' for result in results)
+        count += len(results)
+
+    return count
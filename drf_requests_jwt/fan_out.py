@@ -0,0 +1,122 @@
+"""
+Fan out.
+"""
+import threading
+from collections import defaultdict
+
+from drf_requests_jwt import settings
+from drf_requests_jwt.iterators import iter_merged
+
+
+class FanOutHttpRequestService(object):
+    """
+    Fetch the collections of several API points of the same instance concurrently, with one session, one token,
+    and at most `max_workers` page requests in flight across all of them.
+
+    The `endpoints` map names to url paths, requested with the `service_class`,
+    or to `HttpRequestService` subclasses sharing its base url and credentials:
+
+        service = FanOutHttpRequestService(DeviceHttpRequestService, {
+            'devices': 'api/devices/',
+            'gateways': 'api/gateways/',
+            'sites': SiteHttpRequestService,
+        })
+
+        for name, results in service.iter_pages():
+            ...
+    """
+    max_workers = settings.DEFAULTS.get('FAN_OUT_WORKERS')
+    queue_size = settings.DEFAULTS.get('PIPELINE_QUEUE_SIZE')
+
+    def __init__(self, service_class, endpoints):
+        self.service_class = service_class
+        self.request_semaphore = threading.BoundedSemaphore(self.max_workers)
+
+        self.services = {name: self._build_service(endpoint) for name, endpoint in endpoints.items()}
+        self._check_services()
+
+        # The services create their session on their first request, by then they all hold the shared one.
+        self.session = self._get_session(next(iter(self.services.values()))) if self.services else None
+
+        for service in self.services.values():
+            service.session = self.session
+            service.request_semaphore = self.request_semaphore
+
+    def _build_service(self, endpoint):
+        if isinstance(endpoint, str):
+            endpoint = _build_path_service_class(self.service_class, endpoint)
+
+        return endpoint()
+
+    def _check_services(self):
+        """
+        Make sure the services can share the session and the token, those of the same instance and credentials.
+        """
+        for attribute in ('_get_base_url', '_get_jwt_cache_key'):
+            values = {getattr(service, attribute)() for service in self.services.values()}
+
+            if len(values) > 1:
+                raise ValueError('The services do not share their {}: {}'.format(attribute, sorted(values)))
+
+    def _get_session(self, service):
+        # The pool has to hold a connection for each of the requests in flight.
+        resolved_backend_class = settings.import_from_string(service.session_backend_class)
+        return resolved_backend_class(service._get_base_url(), pool_maxsize=self.max_workers).get_session()
+
+    def get_results_from_all_pages(self):
+        """
+        Return the results of each API point, by name.
+        """
+        results_by_name = defaultdict(list)
+
+        for name, results in self.iter_pages():
+            results_by_name[name].extend(results)
+
+        return {name: results_by_name[name] for name in self.services}
+
+    def iter_results(self):
+        """
+        Yield (name, result) pairs, as soon as each page is decoded.
+        """
+        for name, results in self.iter_pages():
+            for result in results:
+                yield name, result
+
+    def iter_pages(self):
+        """
+        Yield (name, results) pairs as the pages of the API points arrive, those of an API point in order.
+        """
+        self._share_authorization_header()
+
+        yield from iter_merged(
+            {name: service.iter_pages() for name, service in self.services.items()}, self.queue_size
+        )
+
+    def _share_authorization_header(self):
+        """
+        Obtain the token once, instead of every service getting a 401 and waiting for the first one to log in.
+        """
+        services = list(self.services.values())
+        if not services:
+            return
+
+        service = services[0]
+        token = service._get_jwt_token_from_cache()
+
+        if token is None or service._is_jwt_token_expiring(token):
+            with service.authorization_lock:
+                service.update_authorization_header()
+        else:
+            service.headers['Authorization'] = 'Bearer {token}'.format(token=token)
+
+        for other_service in services[1:]:
+            other_service.headers['Authorization'] = service.headers['Authorization']
+
+
+def _build_path_service_class(service_class, path):
+    class PathHttpRequestService(service_class):
+        def _get_url_path(self):
+            return path
+
+    PathHttpRequestService.__name__ = service_class.__name__
+    return PathHttpRequestService
@@ -0,0 +1,117 @@
+"""
+Instrumentation.
+
+The services and the deserializer mixin report through these metrics:
+
+- ``page_fetch_seconds``, ``page_decode_seconds``, ``validation_seconds`` and ``rate_limit_wait_seconds`` histograms,
+- ``page_bytes``, ``page_retries``, ``unauthorized_responses``, ``records_validated`` and ``records_invalid`` counters,
+- ``logins`` and ``token_refreshes`` counters, labelled with their ``outcome``,
+- ``jwt_cache_hits``, ``jwt_cache_misses``, ``response_cache_hits`` and ``response_cache_misses`` counters,
+
+and trace the ``page`` and ``login`` spans.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import metrics as otel_metrics, trace as otel_trace
+except ImportError:
+    otel_metrics = otel_trace = None
+
+
+class Instrumentation(object):
+    """
+    Report nothing, the interface of the instrumentation classes, created with the name of the instrumented service.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def increment(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    @contextmanager
+    def span(self, name, **attributes):
+        yield
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Observe the seconds the block takes.
+        """
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started_at, **labels)
+
+
+class PrometheusInstrumentation(Instrumentation):
+    """
+    Report to the `prometheus_client` default registry, the metrics being labelled with the service.
+    """
+    namespace = 'drf_requests_jwt'
+
+    def increment(self, name, value=1, **labels):
+        metric = self._get_metric(prometheus_client.Counter, name, labels)
+        metric.labels(service=self.service, **labels).inc(value)
+
+    def observe(self, name, value, **labels):
+        metric = self._get_metric(prometheus_client.Histogram, name, labels)
+        metric.labels(service=self.service, **labels).observe(value)
+
+    def _get_metric(self, metric_class, name, labels):
+        # The metrics can only be registered once per process.
+        with _metrics_lock:
+            metric = _metrics.get((metric_class, name))
+
+            if metric is None:
+                metric = metric_class(
+                    name, name.replace('_', ' ').capitalize(), ['service'] + sorted(labels), namespace=self.namespace
+                )
+                _metrics[(metric_class, name)] = metric
+
+        return metric
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    """
+    Trace the spans with the OpenTelemetry global tracer, and report the metrics to its global meter.
+    """
+    instrumentation_name = 'drf_requests_jwt'
+
+    def increment(self, name, value=1, **labels):
+        self._get_instrument('create_counter', name).add(value, dict(labels, service=self.service))
+
+    def observe(self, name, value, **labels):
+        self._get_instrument('create_histogram', name).record(value, dict(labels, service=self.service))
+
+    def span(self, name, **attributes):
+        tracer = otel_trace.get_tracer(self.instrumentation_name)
+        return tracer.start_as_current_span(
+            '{}.{}'.format(self.instrumentation_name, name), attributes=dict(attributes, service=self.service)
+        )
+
+    def _get_instrument(self, create_method, name):
+        with _metrics_lock:
+            instrument = _metrics.get((create_method, name))
+
+            if instrument is None:
+                meter = otel_metrics.get_meter(self.instrumentation_name)
+                instrument = getattr(meter, create_method)('{}.{}'.format(self.instrumentation_name, name))
+                _metrics[(create_method, name)] = instrument
+
+        return instrument
+
+
+_metrics = {}
+_metrics_lock = threading.Lock()
@@ -0,0 +1,76 @@
+"""
+Iterators consumed ahead in background threads.
+"""
+import queue
+import threading
+
+_DONE = object()
+
+
+def iter_merged(iterables, maxsize):
+    """
+    Iterate each of the `iterables`, by name, in a thread of its own, yielding (name, item) pairs as the items arrive,
+    at most `maxsize` ahead of the consumer.
+
+    The first error of an iteration is raised to the consumer, and the threads stop once the consumer stops.
+    """
+    items = queue.Queue(maxsize=maxsize)
+    stopped = threading.Event()
+
+    def put(item):
+        while not stopped.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce(name, iterable):
+        iterator = iter(iterable)
+        error = None
+
+        try:
+            for item in iterator:
+                if not put((name, item, None)):
+                    return
+        except BaseException as e:
+            error = e
+        finally:
+            close = getattr(iterator, 'close', None)
+            if close is not None:
+                close()
+
+        put((name, _DONE, error))
+
+    for name, iterable in iterables.items():
+        threading.Thread(target=produce, args=(name, iterable), daemon=True).start()
+
+    remaining = len(iterables)
+
+    try:
+        while remaining:
+            name, item, error = items.get()
+
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                remaining -= 1
+                continue
+
+            yield name, item
+    finally:
+        stopped.set()
+
+
+def iter_prefetched(iterable, maxsize):
+    """
+    Iterate in a background thread, at most `maxsize` items ahead of the consumer.
+    """
+    merged = iter_merged({None: iterable}, maxsize)
+
+    try:
+        for _, item in merged:
+            yield item
+    finally:
+        merged.close()
@@ -0,0 +1,54 @@
+"""
+Json codecs, decoding from and encoding to utf-8 bytes.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
+
+class JsonCodec(object):
+    """
+    The standard library codec.
+    """
+
+    def loads(self, content):
+        return json.loads(content)
+
+    def dumps(self, value):
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+
+class OrjsonCodec(JsonCodec):
+    def loads(self, content):
+        return orjson.loads(content)
+
+    def dumps(self, value):
+        # Like the standard library, encode the non str keys and the integers beyond 64 bits.
+        try:
+            return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            return super().dumps(value)
+
+
+class UjsonCodec(JsonCodec):
+    def loads(self, content):
+        return ujson.loads(content)
+
+    def dumps(self, value):
+        return ujson.dumps(value, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+
+
+if orjson is not None:
+    DefaultJsonCodec = OrjsonCodec
+elif ujson is not None:
+    DefaultJsonCodec = UjsonCodec
+else:
+    DefaultJsonCodec = JsonCodec
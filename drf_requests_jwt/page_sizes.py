@@ -0,0 +1,43 @@
+"""
+Page sizes.
+"""
+from drf_requests_jwt import settings
+
+
+class PageSizePolicy(object):
+    """
+    Ask for pages of `page_size` records, or the server default when None.
+
+    With a `max_page_size`, the page size grows by `growth_factor` after each page, up to that ceiling,
+    as long as the next page is expected to take less than `latency_limit` seconds and `bytes_limit` bytes.
+    It shrinks back by the same factor after a page over the limits.
+    """
+    page_size = settings.DEFAULTS.get('PAGE_SIZE')
+    max_page_size = settings.DEFAULTS.get('PAGE_SIZE_MAX')
+    latency_limit = settings.DEFAULTS.get('PAGE_SIZE_LATENCY_LIMIT')
+    bytes_limit = settings.DEFAULTS.get('PAGE_SIZE_BYTES_LIMIT')
+    growth_factor = settings.DEFAULTS.get('PAGE_SIZE_GROWTH_FACTOR')
+
+    def get_first_page_size(self):
+        return self.page_size
+
+    def get_next_page_size(self, page_size, results_count, elapsed, content_length):
+        """
+        Return the size of the next page, out of the seconds and bytes the last page took.
+        The last page has `results_count` records, and asked for `page_size`, unless it got the server default.
+        """
+        if self.max_page_size is None:
+            return page_size
+
+        page_size = page_size or results_count
+        if not page_size:
+            return None
+
+        if elapsed > self.latency_limit or content_length > self.bytes_limit:
+            return max(1, int(page_size / self.growth_factor))
+
+        # The latency and the payload grow about linearly with the page size.
+        if elapsed * self.growth_factor > self.latency_limit or content_length * self.growth_factor > self.bytes_limit:
+            return min(page_size, self.max_page_size)
+
+        return min(int(page_size * self.growth_factor), self.max_page_size)
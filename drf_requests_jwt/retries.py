@@ -0,0 +1,61 @@
+"""
+Retries.
+"""
+import random
+import time
+from email.utils import parsedate_to_datetime
+
+from drf_requests_jwt import settings
+
+
+class RetryPolicy(object):
+    """
+    Retry a page request up to `max_attempts` times, on connection errors and on the `status_codes`.
+
+    The delay grows exponentially with full jitter, capped at `backoff_max` seconds,
+    unless the response tells it with a `Retry-After` header, which is waited for in full,
+    up to `retry_after_max` seconds; the request is not retried when it asks for longer.
+    """
+    status_codes = settings.DEFAULTS.get('RETRY_STATUS_CODES')
+    max_attempts = settings.DEFAULTS.get('RETRY_MAX_ATTEMPTS')
+    backoff_factor = settings.DEFAULTS.get('RETRY_BACKOFF_FACTOR')
+    backoff_max = settings.DEFAULTS.get('RETRY_BACKOFF_MAX')
+    retry_after_max = settings.DEFAULTS.get('RETRY_AFTER_MAX')
+
+    def should_retry(self, attempt, status_code=None, retry_after=None):
+        """
+        Tell whether to retry after the `attempt`, which failed to connect when `status_code` is None.
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if status_code is not None and status_code not in self.status_codes:
+            return False
+
+        delay = self._parse_retry_after(retry_after)
+        return delay is None or self.retry_after_max is None or delay <= self.retry_after_max
+
+    def get_delay(self, attempt, retry_after=None):
+        """
+        Return the seconds to wait before the next attempt, honouring the `retry_after` header value if any.
+        """
+        delay = self._parse_retry_after(retry_after)
+
+        if delay is None:
+            delay = min(random.uniform(0, self.backoff_factor * 2 ** (attempt - 1)), self.backoff_max)
+
+        return max(0, delay)
+
+    @staticmethod
+    def _parse_retry_after(retry_after):
+        if not isinstance(retry_after, str):
+            return None
+
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+
+        try:
+            return parsedate_to_datetime(retry_after).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
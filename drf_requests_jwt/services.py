@@ -1,39 +1,131 @@
 """
 Services.
 """
+import contextlib
+import hashlib
+import itertools
+import json
 import logging
+import math
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlencode, urlparse, urlsplit, urlunsplit
+
 import requests
-from urllib.parse import urlparse, parse_qs
 
-from drf_requests_jwt import settings
+from drf_requests_jwt import exports, settings
 from drf_requests_jwt.backends.utils import build_url
+from drf_requests_jwt.exceptions import (
+    ConnectionFailedError, HttpRequestServiceError, ObtainJWTError, ResponseStatusError
+)
+from drf_requests_jwt.tokens import get_jwt_expiry
 
 logger = logging.getLogger(__name__)
 
 
-class HttpRequestService(object):
+class BaseHttpRequestService(object):
+    """
+    The hooks, JWT cache and pagination logic shared by the sync and the async services.
+    """
     obtain_jwt_allowed_fail_attempts = settings.DEFAULTS.get('OBTAIN_JWT_ALLOWED_FAIL_ATTEMPTS')
     cache_backend_class = settings.DEFAULTS.get('CACHE_BACKEND_CLASS')
+    page_fetch_workers = settings.DEFAULTS.get('PAGE_FETCH_WORKERS')
+    jwt_refresh_skew = settings.DEFAULTS.get('JWT_REFRESH_SKEW')
+    retry_policy_class = settings.DEFAULTS.get('RETRY_POLICY_CLASS')
+    checkpoint_backend_class = settings.DEFAULTS.get('CHECKPOINT_BACKEND_CLASS')
+    watermark_backend_class = settings.DEFAULTS.get('WATERMARK_BACKEND_CLASS')
+    watermark_field = settings.DEFAULTS.get('WATERMARK_FIELD')
+    watermark_param = settings.DEFAULTS.get('WATERMARK_PARAM')
+    response_cache_backend_class = settings.DEFAULTS.get('RESPONSE_CACHE_BACKEND_CLASS')
+    json_codec_class = settings.DEFAULTS.get('JSON_CODEC_CLASS')
+    page_size_policy_class = settings.DEFAULTS.get('PAGE_SIZE_POLICY_CLASS')
+    page_size_param = settings.DEFAULTS.get('PAGE_SIZE_PARAM')
+    instrumentation_class = settings.DEFAULTS.get('INSTRUMENTATION_CLASS')
+    rate_limit_backend_class = settings.DEFAULTS.get('RATE_LIMIT_BACKEND_CLASS')
+
+    # With fields, only those are requested, sent comma separated in the `fields_param`.
+    fields = None
+    fields_param = settings.DEFAULTS.get('FIELDS_PARAM')
 
     def __init__(self, params=None):
         super().__init__()
 
+        self.instrumentation = self._get_instrumentation()
         self.cache_backend = self._get_cache_backend()
+        self.retry_policy = self._get_retry_policy()
+        self.json_codec = self._get_json_codec()
+        self.page_size_policy = self._get_page_size_policy()
+
+        # The seconds and the bytes the last page took.
+        self.last_page_stats = (0, 0)
 
         self.params = params or {}
         self.params.update(self._get_params())
+        self.params.update(self._get_fields_params())
 
         self.headers = self._get_headers()
         self.url = self._get_url()
 
-        self.session = requests.Session()
+        self.watermark_backend = self._get_watermark_backend()
+        self.params.update(self._get_watermark_params())
+
+        self.checkpoint_backend = self._get_checkpoint_backend()
+        self.rate_limit_backend = self._get_rate_limit_backend()
 
         self.obtain_jwt_fail_attempts = 0
+        self.jwt_refresh_token = self._get_jwt_refresh_token_from_cache()
+
+    def _get_instrumentation(self):
+        resolved_instrumentation_class = settings.import_from_string(self.instrumentation_class)
+        return resolved_instrumentation_class(self.__class__.__name__)
 
     def _get_cache_backend(self):
         resolved_backend_class = settings.import_from_string(self.cache_backend_class)
         return resolved_backend_class(self._get_jwt_cache_key())
 
+    def _get_retry_policy(self):
+        resolved_policy_class = settings.import_from_string(self.retry_policy_class)
+        return resolved_policy_class()
+
+    def _get_json_codec(self):
+        resolved_codec_class = settings.import_from_string(self.json_codec_class)
+        return resolved_codec_class()
+
+    def _get_page_size_policy(self):
+        resolved_policy_class = settings.import_from_string(self.page_size_policy_class)
+        return resolved_policy_class()
+
+    def _get_checkpoint_backend(self):
+        if self.checkpoint_backend_class is None:
+            return None
+
+        resolved_backend_class = settings.import_from_string(self.checkpoint_backend_class)
+        return resolved_backend_class(self._get_checkpoint_key())
+
+    def _get_watermark_backend(self):
+        if self.watermark_backend_class is None:
+            return None
+
+        resolved_backend_class = settings.import_from_string(self.watermark_backend_class)
+        return resolved_backend_class(self._get_watermark_key())
+
+    def _get_rate_limit_backend(self):
+        if self.rate_limit_backend_class is None:
+            return None
+
+        resolved_backend_class = settings.import_from_string(self.rate_limit_backend_class)
+        return resolved_backend_class(self._get_rate_limit_key())
+
+    def _get_response_cache_backend(self, url, params):
+        if self.response_cache_backend_class is None:
+            return None
+
+        resolved_backend_class = settings.import_from_string(self.response_cache_backend_class)
+        return resolved_backend_class(self._get_response_cache_key(url, params))
+
     def _get_base_url(self):
         raise NotImplementedError
 
@@ -49,6 +141,12 @@ class HttpRequestService(object):
     def _get_jwt_login_url(self):
         return build_url(base_url=self._get_base_url(), path=self._get_jwt_login_url_path())
 
+    def _get_jwt_refresh_url_path(self):
+        return None
+
+    def _get_jwt_refresh_url(self):
+        return build_url(base_url=self._get_base_url(), path=self._get_jwt_refresh_url_path())
+
     def _get_username(self):
         raise NotImplementedError
 
@@ -65,87 +163,664 @@ class HttpRequestService(object):
             'Authorization': 'Bearer {token}'.format(token=self._get_jwt_token_from_cache())
         }
 
+    def _get_conditional_headers(self, cached_response):
+        """
+        Return the headers of a page request, conditional on the validators of its cached response if any.
+        """
+        if not cached_response:
+            return self.headers
+
+        headers = dict(self.headers)
+        if cached_response.get('etag'):
+            headers['If-None-Match'] = cached_response['etag']
+        if cached_response.get('last_modified'):
+            headers['If-Modified-Since'] = cached_response['last_modified']
+        return headers
+
+    def _cache_response(self, response_cache_backend, response_headers, response_json):
+        """
+        Keep the decoded page along with its `ETag` and `Last-Modified` validators.
+        """
+        if response_cache_backend is None:
+            return
+
+        self.instrumentation.increment('response_cache_misses')
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+
+        if etag or last_modified:
+            response_cache_backend.set({'etag': etag, 'last_modified': last_modified, 'data': response_json})
+
+    def _decode_page(self, content, elapsed):
+        """
+        Decode the page content, recording the seconds the request took and the bytes it transferred.
+        """
+        self.last_page_stats = (elapsed, len(content))
+        self.instrumentation.observe('page_fetch_seconds', elapsed)
+        self.instrumentation.increment('page_bytes', len(content))
+
+        with self.instrumentation.timer('page_decode_seconds'):
+            return self.json_codec.loads(content)
+
+    def _reserve_rate_limit(self):
+        """
+        Take a request slot from the rate limit backend if any, and return the seconds to wait for it.
+        """
+        if self.rate_limit_backend is None:
+            return 0
+
+        delay = max(self.rate_limit_backend.reserve(), 0)
+        self.instrumentation.observe('rate_limit_wait_seconds', delay)
+        return delay
+
+    def _get_cached_page(self, cached_response):
+        self.instrumentation.increment('response_cache_hits')
+        return cached_response['data']
+
+    def _get_next_request(self, next_url, page_size=None):
+        """
+        Return the (url, params) to request the `next_url` with, asking for `page_size` records if given.
+
+        The cursor and limit offset pagination links hold the whole query already, so they are requested as they are,
+        without parsing them, nor updating the params.
+        """
+        if _is_self_contained_url(next_url):
+            if page_size is not None:
+                next_url = _replace_query_param(next_url, self.page_size_param, page_size)
+            return next_url, {}
+
+        url = self._split_next_url(next_url)
+
+        # The page numbers depend on the page size, so only the first page asks for it, the next links keep it.
+        if page_size is not None and next_url == self.url:
+            return url, dict(self.params, **{self.page_size_param: page_size})
+
+        return url, self.params
+
+    def _get_next_page_size(self, page_size, response_json):
+        elapsed, content_length = self.last_page_stats
+        return self.page_size_policy.get_next_page_size(
+            page_size, len(response_json.get('results', [])), elapsed, content_length
+        )
+
+    def _split_next_url(self, next_url):
+        """
+        Merge the query of the `next` link into the params and return the url without it.
+        """
+        url_parse = urlparse(next_url)
+
+        self.params.update(parse_qs(url_parse.query))
+
+        return '{scheme}://{netloc}{path}'.format(
+            scheme=url_parse.scheme, netloc=url_parse.netloc, path=url_parse.path
+        )
+
+    def _get_checkpoint(self):
+        """
+        Return the url and the record count to start from, those of the last checkpoint if any.
+        """
+        checkpoint = self.checkpoint_backend.get() if self.checkpoint_backend is not None else None
+
+        if not checkpoint:
+            return self.url, 0
+
+        logger.info('Resuming from %s after %s records', checkpoint['next'], checkpoint['count'])
+        return checkpoint['next'], checkpoint['count']
+
+    def _save_checkpoint(self, next_url, record_count):
+        """
+        Save the `next_url` to resume from, or forget the checkpoint once the last page is done.
+        """
+        if self.checkpoint_backend is None:
+            return
+
+        if next_url:
+            self.checkpoint_backend.set({'next': next_url, 'count': record_count})
+        else:
+            self.checkpoint_backend.delete()
+
+    def _get_fields(self):
+        return self.fields
+
+    def _get_fields_params(self):
+        """
+        Ask for the needed fields only, along with the `watermark_field` in incremental mode.
+        """
+        fields = self._get_fields()
+
+        if not fields or self.fields_param is None:
+            return {}
+
+        fields = list(fields)
+        if self.watermark_backend_class is not None and self.watermark_field not in fields:
+            fields.append(self.watermark_field)
+
+        return {self.fields_param: ','.join(fields)}
+
+    def _get_watermark_params(self):
+        """
+        Filter on the records changed since the last sync, in incremental mode.
+        """
+        watermark = self.watermark_backend.get() if self.watermark_backend is not None else None
+
+        if watermark is None:
+            return {}
+        return {self.watermark_param: watermark}
+
+    def _get_watermark(self, results, watermark):
+        """
+        Return the largest `watermark_field` of the results, or the `watermark` if larger.
+        """
+        if self.watermark_backend is None:
+            return None
+
+        # ISO 8601 timestamps in a single timezone, as DRF renders them, compare in order as strings.
+        for result in results:
+            value = result.get(self.watermark_field) if isinstance(result, dict) else None
+
+            if value is not None and (watermark is None or value > watermark):
+                watermark = value
+
+        return watermark
+
+    def _save_progress(self, results, next_url, record_count, watermark):
+        """
+        Save the progress of the sync once a page was consumed, return the updated record count and watermark.
+        """
+        record_count += len(results)
+        watermark = self._get_watermark(results, watermark)
+
+        self._save_checkpoint(next_url, record_count)
+
+        if not next_url:
+            self._save_watermark(watermark)
+
+        return record_count, watermark
+
+    def _save_watermark(self, watermark):
+        if watermark is not None:
+            self.watermark_backend.set(watermark)
+
+    def _get_remaining_pages(self, response_json):
+        """
+        Compute the (url, params) of every page after the current one, out of its `count` and `next` link.
+        """
+        count = response_json.get('count')
+        next_url = response_json.get('next')
+
+        if count is None or not next_url:
+            return []
+
+        url_parse = urlparse(next_url)
+        query = parse_qs(url_parse.query)
+
+        try:
+            if 'offset' in query and 'limit' in query:
+                limit = int(query['limit'][0])
+                page_queries = [
+                    {'offset': [str(offset)]} for offset in range(int(query['offset'][0]), count, limit)
+                ]
+            elif 'page' in query:
+                page_size = len(response_json.get('results', []))
+                page_queries = [
+                    {'page': [str(page)]} for page in range(int(query['page'][0]), math.ceil(count / page_size) + 1)
+                ]
+            else:
+                return []
+        except (ValueError, ZeroDivisionError):
+            return []
+
+        url = '{scheme}://{netloc}{path}'.format(
+            scheme=url_parse.scheme, netloc=url_parse.netloc, path=url_parse.path
+        )
+
+        pages = []
+        for page_query in page_queries:
+            params = dict(self.params)
+            params.update(query)
+            params.update(page_query)
+            pages.append((url, params))
+
+        return pages
+
+    def get_deserialized_data(self):
+        raise NotImplementedError
+
+    def _get_authorization_token(self):
+        authorization = self.headers.get('Authorization')
+
+        if isinstance(authorization, str) and authorization.startswith('Bearer '):
+            return authorization[len('Bearer '):]
+        return None
+
+    def _is_jwt_token_expiring(self, token):
+        """
+        Tell whether the token expires within the next `jwt_refresh_skew` seconds.
+        """
+        expiry = get_jwt_expiry(token)
+        return expiry is not None and expiry - self.jwt_refresh_skew <= time.time()
+
+    def _is_authorization_header_expiring(self):
+        return self._is_jwt_token_expiring(self._get_authorization_token())
+
+    def _get_fresh_jwt_token_from_cache(self, stale_token):
+        """
+        Return the cached token if someone else obtained it since the `stale_token` was used, None otherwise.
+        """
+        token = self._get_jwt_token_from_cache()
+
+        if token and token != stale_token and not self._is_jwt_token_expiring(token):
+            logger.debug('Received a fresh JWT token from the cache')
+            return token
+        return None
+
+    def _should_refresh_jwt_token(self):
+        return bool(self.jwt_refresh_token) and self._get_jwt_refresh_url_path() is not None
+
+    def _load_jwt_refresh_token(self):
+        """
+        Take the refresh token another service may have received meanwhile, rotating the one of this service.
+        """
+        self.jwt_refresh_token = self._get_jwt_refresh_token_from_cache() or self.jwt_refresh_token
+
+    def _receive_jwt_token(self, response_dict):
+        token = response_dict.get('access')
+        refresh_token = response_dict.get('refresh')
+
+        if refresh_token:
+            self.jwt_refresh_token = refresh_token
+            self._set_jwt_refresh_token_to_cache(refresh_token)
+
+        self._set_jwt_token_to_cache(token)
+        logger.debug('Received a fresh JWT token')
+        return token
+
+    def _should_update_authorization_header(self):
+        return self.obtain_jwt_fail_attempts <= self.obtain_jwt_allowed_fail_attempts
+
+    def _set_jwt_token_to_cache(self, token):
+        self.cache_backend.set_jwt(token)
+
+    def _set_jwt_refresh_token_to_cache(self, token):
+        if self._get_jwt_refresh_url_path() is not None:
+            self.cache_backend.set_refresh_jwt(token)
+
+    def _get_jwt_refresh_token_from_cache(self):
+        if self._get_jwt_refresh_url_path() is None:
+            return None
+        return self.cache_backend.get_refresh_jwt()
+
+    def _get_jwt_token_from_cache(self):
+        token = self.cache_backend.get_jwt()
+        self.instrumentation.increment('jwt_cache_hits' if token else 'jwt_cache_misses')
+        return token
+
+    def _get_jwt_cache_key(self):
+        return 'jwt-{url}-{username}'.format(url=self._get_base_url(), username=self._get_username())
+
+    def _get_watermark_key(self):
+        return 'watermark-{url}-{params}'.format(url=self.url, params=self._get_params_digest())
+
+    def _get_checkpoint_key(self):
+        return 'checkpoint-{url}-{params}'.format(url=self.url, params=self._get_params_digest())
+
+    def _get_rate_limit_key(self):
+        return 'rate-limit-{url}'.format(url=self._get_base_url())
+
+    def _get_response_cache_key(self, url, params):
+        return 'response-{url}-{params}'.format(url=url, params=self._get_params_digest(params))
+
+    def _get_params_digest(self, params=None):
+        params = json.dumps(self.params if params is None else params, sort_keys=True, default=str)
+        return hashlib.sha1(params.encode()).hexdigest()
+
+
+class HttpRequestService(BaseHttpRequestService):
+    session_backend_class = settings.DEFAULTS.get('SESSION_BACKEND_CLASS')
+
+    # Held during each page request, a semaphore shared between services limits their requests in flight.
+    request_semaphore = contextlib.nullcontext()
+
+    def __init__(self, params=None, session=None):
+        super().__init__(params=params)
+
+        self._session = session
+        self._session_lock = threading.Lock()
+        self.authorization_lock = threading.Lock()
+
+    @property
+    def session(self):
+        """
+        The given session, else one from the session backend, created on the first request.
+        """
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._get_session()
+
+        return self._session
+
+    @session.setter
+    def session(self, session):
+        self._session = session
+
+    def _get_session_backend(self):
+        resolved_backend_class = settings.import_from_string(self.session_backend_class)
+        return resolved_backend_class(self._get_base_url(), pool_maxsize=self.page_fetch_workers)
+
+    def _get_session(self):
+        return self._get_session_backend().get_session()
+
     def get_results_from_all_pages(self):
-        next_url = self.url
-        result_list = []
+        """
+        Return the results of all the pages, from the first one.
+
+        As none of them is kept before the list is returned, no checkpoint is resumed from nor saved,
+        and the watermark is only saved once the last page is fetched.
+        """
+        results = []
+        watermark = None
+
+        for page_results, next_link in self._iter_page_links(self.url):
+            results.extend(page_results)
+            watermark = self._get_watermark(page_results, watermark)
+
+            if not next_link:
+                self._save_watermark(watermark)
+
+        return results
+
+    def iter_results(self):
+        """
+        Yield results one by one, as soon as each page is decoded.
+        """
+        for results in self.iter_pages():
+            yield from results
+
+    def iter_pages(self):
+        """
+        Yield the results list of each page, following the `next` link until the last page.
+
+        With a `checkpoint_backend_class`, the next link and the record count are saved once the consumer
+        asks for the page after, so that a sync which did not finish resumes from there.
+        With a `watermark_backend_class`, the largest `watermark_field` is saved once the last page is done.
+
+        With more than one `page_fetch_workers`, the remaining pages of a page number or limit offset
+        paginated endpoint are fetched concurrently, and still yielded in order.
+        """
+        next_url, record_count = self._get_checkpoint()
+        watermark = None
+
+        for results, next_link in self._iter_page_links(next_url):
+            yield results
+
+            record_count, watermark = self._save_progress(results, next_link, record_count, watermark)
+
+    def _iter_page_links(self, next_url):
+        """
+        Yield the results list of each page along with its `next` link, starting from the `next_url`,
+        leaving the progress of the sync to be saved by the caller.
+        """
+        pages_collected = 0
+
+        try:
+            for response_json in self._iter_responses(next_url):
+                pages_collected += 1
+                yield response_json.get('results', []), response_json.get('next')
+        except HttpRequestServiceError as e:
+            e.pages_collected = pages_collected
+            raise
+
+    def _iter_responses(self, next_url):
+        """
+        Yield the decoded json of each page, starting from the `next_url`.
+        """
+        is_first_page = True
+        page_size = self.page_size_policy.get_first_page_size()
+
+        while next_url:
+            url, params = self._get_next_request(next_url, page_size)
+
+            response_json = self._get_page(url, params)
+
+            if response_json is None:
+                break
+
+            next_url = response_json.get('next')
+            page_size = self._get_next_page_size(page_size, response_json)
+            yield response_json
+
+            if is_first_page and self.page_fetch_workers > 1:
+                remaining_pages = self._get_remaining_pages(response_json)
+
+                if remaining_pages:
+                    yield from self._iter_concurrent_pages(remaining_pages)
+                    break
+
+            is_first_page = False
+
+    def _get_page(self, url, params):
+        """
+        Request one page and return its decoded json, or None when no valid JWT token could be obtained.
+        """
+        with self.instrumentation.span('page', url=url):
+            return self._request_page(url, params)
+
+    def _request_page(self, url, params):
+        response_cache_backend = self._get_response_cache_backend(url, params)
+        cached_response = response_cache_backend.get() if response_cache_backend is not None else None
+        # Only the attempts retried count, not those the authorization header is updated after.
+        attempt = 1
 
         while True:
-            url_parse = urlparse(next_url)
+            self._update_expiring_authorization_header()
+
+            authorization = self.headers.get('Authorization')
 
-            self.params.update(parse_qs(url_parse.query))
+            try:
+                self._wait_for_rate_limit()
 
-            next_url = '{scheme}://{netloc}{path}'.format(
-                scheme=url_parse.scheme, netloc=url_parse.netloc, path=url_parse.path
-            )
+                with self.request_semaphore:
+                    started_at = time.monotonic()
+                    response = self.session.get(
+                        url, headers=self._get_conditional_headers(cached_response), params=params
+                    )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if not self.retry_policy.should_retry(attempt):
+                    raise ConnectionFailedError('Request to {} failed: {}'.format(url, e)) from e
 
-            response = self.session.get(next_url, headers=self.headers, params=self.params)
+                logger.warning('Request url: %s failed, retrying: %s', url, e)
+                self.instrumentation.increment('page_retries')
+                time.sleep(self.retry_policy.get_delay(attempt))
+                attempt += 1
+                continue
 
-            logger.debug('Request url: {} with params {}'.format(next_url, self.params))
+            logger.debug('Request url: %s with params %s', url, params)
 
             if response.status_code == 200:
-                response_json = response.json()
-                next_url = response_json.get('next')
-                result_list.extend(response_json.get('results', []))
+                response_json = self._decode_page(response.content, time.monotonic() - started_at)
+                self._cache_response(response_cache_backend, response.headers, response_json)
+                return response_json
+            elif response.status_code == 304 and cached_response:
+                return self._get_cached_page(cached_response)
             elif response.status_code == 401:
-                if self._should_update_authorization_header():
-                    self.update_authorization_header()
-                else:
-                    break
+                self.instrumentation.increment('unauthorized_responses')
+                if not self._update_stale_authorization_header(authorization):
+                    return None
+            elif self.retry_policy.should_retry(attempt, response.status_code, response.headers.get('Retry-After')):
+                logger.warning('Request url: %s got status code %s, retrying', url, response.status_code)
+                self.instrumentation.increment('page_retries')
+                time.sleep(self.retry_policy.get_delay(attempt, response.headers.get('Retry-After')))
+                attempt += 1
             else:
-                raise Exception('Wrong response status code: {code}, content: {content}'.format(
-                    code=response.status_code,
-                    content=response.content
-                ))
+                raise ResponseStatusError(response.status_code, response.content)
 
-            if not bool(next_url):
-                break
+    def _wait_for_rate_limit(self):
+        delay = self._reserve_rate_limit()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def _update_stale_authorization_header(self, authorization):
+        """
+        Update the authorization header only if no other worker did it since the `authorization` was sent.
+        """
+        with self.authorization_lock:
+            if self.headers.get('Authorization') != authorization:
+                return True
+
+            if not self._should_update_authorization_header():
+                return False
+
+            self.update_authorization_header()
+            return True
+
+    def _update_expiring_authorization_header(self):
+        """
+        Update the authorization header before the token expires, instead of waiting for a 401.
+        """
+        if not self._is_authorization_header_expiring():
+            return
+
+        with self.authorization_lock:
+            if self._is_authorization_header_expiring() and self._should_update_authorization_header():
+                self.update_authorization_header()
+
+    def _iter_concurrent_pages(self, pages):
+        """
+        Fetch the pages with a pool of `page_fetch_workers` threads, keeping at most that many pages in flight.
+        """
+        pages = iter(pages)
+        futures = deque()
+
+        with ThreadPoolExecutor(max_workers=self.page_fetch_workers) as executor:
+            try:
+                for url, params in itertools.islice(pages, self.page_fetch_workers):
+                    futures.append(executor.submit(self._get_page, url, params))
+
+                while futures:
+                    response_json = futures.popleft().result()
+
+                    for url, params in itertools.islice(pages, 1):
+                        futures.append(executor.submit(self._get_page, url, params))
+
+                    if response_json is None:
+                        break
+
+                    yield response_json
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def write_results_from_all_pages_to_file(self, filename, format=exports.JSON, compression=None):
+        """
+        Stream the results to a json array or json lines file, optionally gzip or zstd compressed,
+        page by page, and return their count. The file only appears once all the pages are written.
 
-        return result_list
+        As a file left unfinished is dropped, the export starts from the first page without saving checkpoints,
+        and the watermark is only saved once the file is in place.
+        """
+        progress = {'watermark': None, 'finished': False}
 
-    def write_results_from_all_pages_to_file(self, filename):
-        results = self.get_results_from_all_pages()
+        def iter_pages():
+            for results, next_link in self._iter_page_links(self.url):
+                progress['watermark'] = self._get_watermark(results, progress['watermark'])
+                progress['finished'] = not next_link
+                yield results
 
-        with open(filename, 'w') as output:
-            json.dump(results, output)
+        with exports.open_export_file(filename, compression=compression) as output:
+            count = exports.write_pages(output, iter_pages(), format=format, codec=self.json_codec)
+
+        if progress['finished']:
+            self._save_watermark(progress['watermark'])
+
+        return count
 
     def update_authorization_header(self):
         token = self._get_jwt_token()
         self.headers['Authorization'] = 'Bearer {token}'.format(token=token)
 
-    def get_deserialized_data(self):
-        raise NotImplementedError
-
     def _get_jwt_token(self):
+        """
+        Obtain a token holding the cache backend lock, so that only one caller per cache key logs in at a time.
+        """
+        stale_token = self._get_authorization_token()
+
+        with self.cache_backend.lock():
+            token = self._get_fresh_jwt_token_from_cache(stale_token)
+
+            if token is None:
+                with self.instrumentation.span('login'):
+                    token = self._obtain_jwt_token()
+
+        return token
+
+    def _obtain_jwt_token(self):
+        self._load_jwt_refresh_token()
+
+        if self._should_refresh_jwt_token():
+            token = self._refresh_jwt_token()
+            if token is not None:
+                return token
+
         payload = {
             'username': self._get_username(),
             'password': self._get_password()
         }
         url = self._get_jwt_login_url()
-        logger.debug('Request url: {}'.format(url))
+        logger.debug('Request url: %s', url)
+        self._wait_for_rate_limit()
         response = self.session.post(url, data=payload)
 
         if response.status_code == 200:
-            response_dict = response.json()
-            token = response_dict.get('access')
-            self._set_jwt_token_to_cache(token)
-            logger.debug('Received a fresh JWT token')
-            return token
+            self.instrumentation.increment('logins', outcome='success')
+            return self._receive_jwt_token(self.json_codec.loads(response.content))
         else:
             self.obtain_jwt_fail_attempts += 1
+            self.instrumentation.increment('logins', outcome='failure')
             logger.warning('Attempt to get a JWT token failed')
-            raise Exception('Wrong response status code: {code}, content: {content}'.format(
-                code=response.status_code,
-                content=response.content
-            ))
+            raise ObtainJWTError(response.status_code, response.content)
 
-    def _should_update_authorization_header(self):
-        return self.obtain_jwt_fail_attempts <= self.obtain_jwt_allowed_fail_attempts
+    def _refresh_jwt_token(self):
+        """
+        Get a new access token from the refresh endpoint, or None so that the caller logs in again.
+        """
+        url = self._get_jwt_refresh_url()
+        logger.debug('Request url: %s', url)
+        self._wait_for_rate_limit()
+        response = self.session.post(url, data={'refresh': self.jwt_refresh_token})
 
-    def _set_jwt_token_to_cache(self, token):
-        self.cache_backend.set_jwt(token)
+        if response.status_code == 200:
+            self.instrumentation.increment('token_refreshes', outcome='success')
+            return self._receive_jwt_token(self.json_codec.loads(response.content))
 
-    def _get_jwt_token_from_cache(self):
-        return self.cache_backend.get_jwt()
+        self.instrumentation.increment('token_refreshes', outcome='failure')
+        logger.warning('Attempt to refresh the JWT token failed')
+        self.jwt_refresh_token = None
+        return None
 
-    def _get_jwt_cache_key(self):
-        return 'jwt-{url}-{username}'.format(url=self._get_base_url(), username=self._get_username())
+
+_CURSOR_QUERY_RE = re.compile(r'(?:^|&)cursor=')
+_LIMIT_QUERY_RE = re.compile(r'(?:^|&)limit=')
+_OFFSET_QUERY_RE = re.compile(r'(?:^|&)offset=')
+
+
+def _is_self_contained_url(url):
+    """
+    Tell whether the url is a DRF `CursorPagination` or `LimitOffsetPagination` link.
+    """
+    query = url.partition('?')[2]
+
+    if _CURSOR_QUERY_RE.search(query):
+        return True
+
+    return bool(_LIMIT_QUERY_RE.search(query) and _OFFSET_QUERY_RE.search(query))
+
+
+def _replace_query_param(url, key, value):
+    scheme, netloc, path, query, fragment = urlsplit(url)
+
+    query_dict = parse_qs(query, keep_blank_values=True)
+    query_dict[key] = [value]
+
+    return urlunsplit((scheme, netloc, path, urlencode(sorted(query_dict.items()), doseq=True), fragment))
@@ -0,0 +1,69 @@
+"""
+Sessions.
+"""
+import threading
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+
+from drf_requests_jwt import settings
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class SessionBackend(object):
+    """
+    Create a new `requests.Session` for each service, with a tuned connection pool.
+    """
+    pool_connections = settings.DEFAULTS.get('SESSION_POOL_CONNECTIONS')
+    pool_maxsize = settings.DEFAULTS.get('SESSION_POOL_MAXSIZE')
+    max_retries = settings.DEFAULTS.get('SESSION_MAX_RETRIES')
+
+    def __init__(self, base_url, pool_maxsize=None):
+        self.base_url = base_url
+
+        # The pool has to hold a connection for each of the workers sharing the session.
+        self.pool_maxsize = max(self.pool_maxsize, pool_maxsize or 0)
+
+    def get_session(self):
+        return self._create_session()
+
+    def _create_session(self):
+        session = requests.Session()
+
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            max_retries=self.max_retries
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+
+        return session
+
+
+class SharedSessionBackend(SessionBackend):
+    """
+    Share one `requests.Session` per base url and pool settings between all the services of the process,
+    so that short lived services reuse the open connections instead of a new handshake each.
+    """
+
+    def get_session(self):
+        key = (self.base_url, self.pool_connections, self.pool_maxsize, self.max_retries)
+
+        with _sessions_lock:
+            session = _sessions.get(key)
+
+            if session is None:
+                session = _sessions[key] = self._create_session()
+
+        return session
+
+    def _create_session(self):
+        session = super()._create_session()
+
+        # The services sharing the session may log in as different users, the cookies of one must not reach another.
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+
+        return session
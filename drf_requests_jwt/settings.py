@@ -20,5 +20,43 @@ def import_from_string(val):
 
 DEFAULTS = {
     'OBTAIN_JWT_ALLOWED_FAIL_ATTEMPTS': 3,
-    'CACHE_BACKEND_CLASS': 'drf_requests_jwt.backends.file_cache.FileCacheBackend'
+    'CACHE_BACKEND_CLASS': 'drf_requests_jwt.backends.file_cache.FileCacheBackend',
+    'FILE_CACHE_DIR': '/tmp',
+    'DJANGO_CACHE_ALIAS': 'default',
+    'PAGE_FETCH_WORKERS': 1,
+    'SESSION_BACKEND_CLASS': 'drf_requests_jwt.sessions.SessionBackend',
+    'SESSION_POOL_CONNECTIONS': 10,
+    'SESSION_POOL_MAXSIZE': 10,
+    'SESSION_MAX_RETRIES': 0,
+    'JWT_REFRESH_SKEW': 30,
+    'CHECKPOINT_BACKEND_CLASS': None,
+    'WATERMARK_BACKEND_CLASS': None,
+    'WATERMARK_FIELD': 'updated_at',
+    'WATERMARK_PARAM': 'updated_at__gt',
+    'RESPONSE_CACHE_BACKEND_CLASS': None,
+    'RETRY_POLICY_CLASS': 'drf_requests_jwt.retries.RetryPolicy',
+    'RETRY_STATUS_CODES': (429, 500, 502, 503, 504),
+    'RETRY_MAX_ATTEMPTS': 3,
+    'RETRY_BACKOFF_FACTOR': 0.5,
+    'RETRY_BACKOFF_MAX': 30,
+    'RETRY_AFTER_MAX': 300,
+    'BULK_BATCH_SIZE': None,
+    'PIPELINE_CHUNK_SIZE': 500,
+    'PIPELINE_QUEUE_SIZE': 4,
+    'VALIDATION_WORKERS': 1,
+    'JSON_CODEC_CLASS': 'drf_requests_jwt.json_codecs.DefaultJsonCodec',
+    'PAGE_SIZE_POLICY_CLASS': 'drf_requests_jwt.page_sizes.PageSizePolicy',
+    'PAGE_SIZE_PARAM': 'page_size',
+    'PAGE_SIZE': None,
+    'PAGE_SIZE_MAX': None,
+    'PAGE_SIZE_LATENCY_LIMIT': 2.0,
+    'PAGE_SIZE_BYTES_LIMIT': 8 * 1024 * 1024,
+    'PAGE_SIZE_GROWTH_FACTOR': 2,
+    'INSTRUMENTATION_CLASS': 'drf_requests_jwt.instrumentation.Instrumentation',
+    'FAN_OUT_WORKERS': 8,
+    'RATE_LIMIT_BACKEND_CLASS': None,
+    'RATE_LIMIT_RATE': 10,
+    'RATE_LIMIT_BURST': 10,
+    'FIELDS_PARAM': 'fields',
+    'FIELDS_FROM_SERIALIZER': False,
 }
@@ -0,0 +1,17 @@
+try:
+    import django
+    from django.conf import settings
+except ImportError:
+    django = None
+
+# The tests of the Django backends, of the DRF validation and of the bulk mode are skipped without Django.
+if django is not None and not settings.configured:
+    settings.configure(
+        CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'default'},
+            'tokens': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tokens'},
+        },
+        DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+        INSTALLED_APPS=['drf_requests_jwt.tests'],
+    )
+    django.setup()
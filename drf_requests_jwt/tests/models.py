@@ -0,0 +1,6 @@
+from django.db import models
+
+
+class Device(models.Model):
+    eui = models.CharField(max_length=16, unique=True)
+    name = models.CharField(max_length=64, blank=True)
@@ -0,0 +1,256 @@
+import asyncio
+import threading
+from unittest import IsolatedAsyncioTestCase, skipIf
+
+import mock
+
+try:
+    from aiohttp import web
+    from aiohttp.test_utils import TestServer
+
+    from drf_requests_jwt.async_services import AsyncHttpRequestService
+    from drf_requests_jwt.exceptions import ObtainJWTError
+except ImportError:
+    web = None
+
+
+def _build_app(count, page_size, state):
+    async def login(request):
+        state['logins'] += 1
+        data = await request.post()
+        if data.get('username') != 'joe' or data.get('password') != 'secret':
+            return web.json_response({}, status=400)
+        state['token'] = 'token-{}'.format(state['logins'])
+        return web.json_response({'access': state['token'], 'refresh': 'refresh'})
+
+    async def devices(request):
+        state['requests'] += 1
+        if request.headers.get('Authorization') != 'Bearer {}'.format(state['token']):
+            return web.json_response({}, status=401)
+
+        etag = '"{}-{}"'.format(request.query_string, state['version'])
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304)
+
+        page = int(request.query.get('page', '1'))
+        last_page = (count + page_size - 1) // page_size
+        next_url = None
+        if page < last_page:
+            next_url = str(request.url.with_query(page=page + 1, kind=request.query.get('kind')))
+
+        return web.json_response({
+            'count': count,
+            'next': next_url,
+            'results': [{'id': i} for i in range((page - 1) * page_size, min(page * page_size, count))]
+        }, headers={'ETag': etag})
+
+    app = web.Application()
+    app.router.add_post('/api/auth/jwt/login/', login)
+    app.router.add_get('/api/devices/', devices)
+    return app
+
+
+class DictStoreBackend(object):
+    values = {}
+
+    def __init__(self, key):
+        self.key = key
+
+    def get(self):
+        return self.values.get(self.key)
+
+    def set(self, value):
+        self.values[self.key] = value
+
+    def delete(self):
+        self.values.pop(self.key, None)
+
+
+@skipIf(web is None, 'aiohttp is not installed')
+class AsyncHttpRequestServiceTestCase(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        patcher = mock.patch.object(DictStoreBackend, 'values', {})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.state = {'logins': 0, 'requests': 0, 'token': 'not-obtained-yet', 'version': 1}
+        self.server = TestServer(_build_app(count=9, page_size=2, state=self.state))
+        await self.server.start_server()
+
+        base_url = str(self.server.make_url(''))
+
+        class DeviceAsyncHttpRequestService(AsyncHttpRequestService):
+            def _get_base_url(self):
+                return base_url
+
+            def _get_url_path(self):
+                return 'api/devices/'
+
+            def _get_jwt_login_url_path(self):
+                return 'api/auth/jwt/login/'
+
+            def _get_username(self):
+                return 'joe'
+
+            def _get_password(self):
+                return 'secret'
+
+            def _get_params(self):
+                return {'kind': 'sensor'}
+
+        self.service_class = DeviceAsyncHttpRequestService
+
+        patcher = mock.patch.object(AsyncHttpRequestService, '_get_cache_backend')
+        self.get_cache_backend_mock = patcher.start()
+        self.get_cache_backend_mock.return_value.get_jwt.return_value = None
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_get_results_from_all_pages(self):
+        async with self.service_class() as service:
+            actual_result = await service.get_results_from_all_pages()
+
+        self.assertListEqual(actual_result, [{'id': i} for i in range(9)])
+        self.assertEqual(self.state['logins'], 1)
+        self.get_cache_backend_mock.return_value.set_jwt.assert_called_once_with('token-1')
+
+    async def test_iter_pages_concurrent_refreshes_token_once(self):
+        async with self.service_class() as service:
+            service.page_fetch_workers = 3
+
+            pages = service.iter_pages()
+            first_page = await pages.__anext__()
+
+            # Expire the token on the server, all the in flight pages get a 401.
+            self.state['token'] = 'expired'
+
+            actual_result = first_page + [result async for results in pages for result in results]
+
+        self.assertListEqual(actual_result, [{'id': i} for i in range(9)])
+        self.assertEqual(self.state['logins'], 2)
+
+    async def test_get_results_from_all_pages_login_failure(self):
+        class WrongPasswordService(self.service_class):
+            def _get_password(self):
+                return 'wrong'
+
+        async with WrongPasswordService() as service:
+            with self.assertRaises(ObtainJWTError):
+                await service.get_results_from_all_pages()
+
+        self.assertEqual(self.state['logins'], 1)
+
+    async def test_get_results_from_all_pages_not_modified(self):
+        class CachedDeviceAsyncHttpRequestService(self.service_class):
+            response_cache_backend_class = 'drf_requests_jwt.tests.test_async_services.DictStoreBackend'
+
+        async with CachedDeviceAsyncHttpRequestService() as service:
+            first_result = await service.get_results_from_all_pages()
+
+        with mock.patch.object(DictStoreBackend, 'set') as set_mock:
+            async with CachedDeviceAsyncHttpRequestService() as service:
+                second_result = await service.get_results_from_all_pages()
+
+        self.assertListEqual(first_result, [{'id': i} for i in range(9)])
+        self.assertListEqual(second_result, first_result)
+        self.assertEqual(set_mock.call_count, 0)
+
+    async def test_get_results_from_all_pages_rate_limited_off_loop(self):
+        class RateLimitedDeviceAsyncHttpRequestService(self.service_class):
+            rate_limit_backend_class = 'drf_requests_jwt.backends.memory_cache.MemoryRateLimitBackend'
+
+        reserving_threads = []
+
+        def reserve():
+            reserving_threads.append(threading.current_thread())
+            return 0
+
+        with mock.patch('drf_requests_jwt.backends.memory_cache.MemoryRateLimitBackend.reserve', side_effect=reserve):
+            async with RateLimitedDeviceAsyncHttpRequestService() as service:
+                actual_result = await service.get_results_from_all_pages()
+
+        self.assertListEqual(actual_result, [{'id': i} for i in range(9)])
+        # The first page getting a 401, the login and the five pages, none of them reserved on the event loop thread.
+        self.assertEqual(len(reserving_threads), 7)
+        self.assertNotIn(threading.current_thread(), reserving_threads)
+
+    async def test_iter_results_backends_off_loop(self):
+        class CheckpointedDeviceAsyncHttpRequestService(self.service_class):
+            response_cache_backend_class = 'drf_requests_jwt.tests.test_async_services.DictStoreBackend'
+            checkpoint_backend_class = 'drf_requests_jwt.tests.test_async_services.DictStoreBackend'
+
+        calling_threads = []
+
+        def record_thread(method):
+            def wrapper(*args, **kwargs):
+                calling_threads.append(threading.current_thread())
+                return method(*args, **kwargs)
+            return wrapper
+
+        self.get_cache_backend_mock.return_value.get_jwt.side_effect = record_thread(lambda: None)
+        self.get_cache_backend_mock.return_value.set_jwt.side_effect = record_thread(lambda token: None)
+
+        recording_methods = {name: record_thread(getattr(DictStoreBackend, name)) for name in ('get', 'set', 'delete')}
+
+        with mock.patch.multiple(DictStoreBackend, **recording_methods):
+            async with CheckpointedDeviceAsyncHttpRequestService() as service:
+                # Only the constructor reads the token cache on the event loop, once.
+                calling_threads.clear()
+                actual_result = [result async for result in service.iter_results()]
+
+        self.assertListEqual(actual_result, [{'id': i} for i in range(9)])
+        self.assertGreater(len(calling_threads), 0)
+        self.assertNotIn(threading.current_thread(), calling_threads)
+
+    async def test_iter_pages_stopped_early_awaits_pending_pages(self):
+        async with self.service_class() as service:
+            service.page_fetch_workers = 3
+
+            pages = service.iter_pages()
+            first_page = await pages.__anext__()
+            second_page = await pages.__anext__()
+
+            with mock.patch('drf_requests_jwt.async_services.asyncio.gather', wraps=asyncio.gather) as gather_mock:
+                await pages.aclose()
+
+            pending_pages = [task for task in asyncio.all_tasks() if '_get_page' in task.get_coro().__qualname__]
+
+        self.assertListEqual(first_page + second_page, [{'id': i} for i in range(4)])
+        self.assertEqual(gather_mock.call_count, 1)
+        self.assertListEqual(pending_pages, [])
+
+    async def test_get_results_from_all_pages_login_holds_backend_lock(self):
+        lock = self.get_cache_backend_mock.return_value.lock.return_value
+        locking_threads = []
+        lock.__enter__.side_effect = lambda: locking_threads.append(threading.current_thread())
+
+        async with self.service_class() as service:
+            actual_result = await service.get_results_from_all_pages()
+
+        self.assertListEqual(actual_result, [{'id': i} for i in range(9)])
+        self.assertEqual(self.state['logins'], 1)
+        self.assertEqual(lock.__enter__.call_count, 1)
+        self.assertEqual(lock.__exit__.call_count, 1)
+        self.assertNotIn(threading.current_thread(), locking_threads)
+
+    async def test_get_jwt_token_cancelled_releases_backend_lock(self):
+        lock = self.get_cache_backend_mock.return_value.lock.return_value
+        lock_released = threading.Event()
+        lock_taken = threading.Event()
+        lock.__enter__.side_effect = lambda: lock_taken.wait(5)
+        lock.__exit__.side_effect = lambda *args: lock_released.set()
+
+        async with self.service_class() as service:
+            task = asyncio.ensure_future(service.update_authorization_header())
+            await asyncio.sleep(0.01)
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            lock_taken.set()
+
+        self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, lock_released.wait, 5))
+        self.assertEqual(self.state['logins'], 0)
@@ -0,0 +1,404 @@
+import os
+import tempfile
+import threading
+import time
+import uuid
+from unittest import TestCase, skipIf
+
+import mock
+
+try:
+    import django
+except ImportError:
+    django = None
+
+from drf_requests_jwt.backends.base import BaseBackend, BaseRateLimitBackend
+from drf_requests_jwt.backends.file_cache import FileCacheBackend, FileStoreBackend
+from drf_requests_jwt.backends.memory_cache import MemoryCacheBackend, MemoryRateLimitBackend
+from drf_requests_jwt.tests.test_tokens import build_jwt
+
+if django is not None:
+    from django.core.cache import caches
+    from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+    from drf_requests_jwt.backends.django_cache import (
+        DjangoCacheBackend, DjangoCacheRateLimitBackend, DjangoCacheStoreBackend
+    )
+
+
+class BaseBackendTestCase(TestCase):
+    def test_refresh_jwt_is_kept_next_to_the_jwt(self):
+        class MemoryOnlyCacheBackend(MemoryCacheBackend):
+            wrapped_backend_class = None
+
+        key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+        refresh_token = build_jwt({'exp': time.time() + 3600})
+
+        MemoryOnlyCacheBackend(key).set_jwt('token123')
+        MemoryOnlyCacheBackend(key).set_refresh_jwt(refresh_token)
+
+        self.assertEqual(MemoryOnlyCacheBackend(key).get_jwt(), 'token123')
+        self.assertEqual(MemoryOnlyCacheBackend(key).get_refresh_jwt(), refresh_token)
+
+    def test_refresh_jwt_expired(self):
+        class MemoryOnlyCacheBackend(MemoryCacheBackend):
+            wrapped_backend_class = None
+
+        key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+        MemoryOnlyCacheBackend(key).set_refresh_jwt(build_jwt({'exp': time.time() - 1}))
+
+        self.assertIsNone(MemoryOnlyCacheBackend(key).get_refresh_jwt())
+
+    def test_lock_is_shared_per_key(self):
+        self.assertIs(BaseBackend('jwt-a').lock(), BaseBackend('jwt-a').lock())
+        self.assertIsNot(BaseBackend('jwt-a').lock(), BaseBackend('jwt-b').lock())
+
+
+class BaseRateLimitBackendTestCase(TestCase):
+    @mock.patch('drf_requests_jwt.backends.base.time.sleep')
+    def test_acquire_sleeps_for_the_delay(self, sleep_mock):
+        backend = BaseRateLimitBackend('rate-limit-a')
+
+        with mock.patch.object(backend, 'reserve', side_effect=[-0.1, 0.25]):
+            backend.acquire()
+            sleep_mock.assert_not_called()
+
+            backend.acquire()
+            sleep_mock.assert_called_once_with(0.25)
+
+
+class FileCacheBackendTestCase(TestCase):
+    def setUp(self):
+        self.key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        patcher = mock.patch.object(FileCacheBackend, 'cache_dir', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_jwt_missing(self):
+        self.assertIsNone(FileCacheBackend(self.key).get_jwt())
+
+    def test_set_jwt(self):
+        FileCacheBackend(self.key).set_jwt('token123')
+        self.assertEqual(FileCacheBackend(self.key).get_jwt(), 'token123')
+        self.assertListEqual(os.listdir(FileCacheBackend.cache_dir), [self.key])
+
+    def test_set_jwt_with_expiry(self):
+        token = build_jwt({'exp': time.time() + 300})
+
+        FileCacheBackend(self.key).set_jwt(token)
+        self.assertEqual(FileCacheBackend(self.key).get_jwt(), token)
+
+    def test_get_jwt_expired(self):
+        FileCacheBackend(self.key).set_jwt(build_jwt({'exp': time.time() - 1}))
+        self.assertIsNone(FileCacheBackend(self.key).get_jwt())
+
+    def test_get_jwt_without_expiry_line(self):
+        backend = FileCacheBackend(self.key)
+
+        with open(backend.file_path, 'w') as f:
+            f.write('token123')
+
+        self.assertEqual(backend.get_jwt(), 'token123')
+
+    def test_lock_single_flight(self):
+        logins = []
+
+        def get_token():
+            backend = FileCacheBackend(self.key)
+            with backend.lock():
+                if backend.get_jwt() is None:
+                    time.sleep(0.05)
+                    logins.append(1)
+                    backend.set_jwt('token123')
+
+        threads = [threading.Thread(target=get_token) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(logins), 1)
+
+
+class FileStoreBackendTestCase(TestCase):
+    def setUp(self):
+        self.key = 'checkpoint-test-{}'.format(uuid.uuid4().hex)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        patcher = mock.patch.object(FileStoreBackend, 'cache_dir', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_set_delete(self):
+        self.assertIsNone(FileStoreBackend(self.key).get())
+
+        FileStoreBackend(self.key).set({'next': 'http://base/?page=2', 'count': 10})
+        self.assertDictEqual(FileStoreBackend(self.key).get(), {'next': 'http://base/?page=2', 'count': 10})
+
+        FileStoreBackend(self.key).delete()
+        FileStoreBackend(self.key).delete()
+        self.assertIsNone(FileStoreBackend(self.key).get())
+
+
+class MemoryCacheBackendTestCase(TestCase):
+    def setUp(self):
+        self.key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+
+        patcher = mock.patch.object(FileCacheBackend, 'cache_dir', cache_dir.name)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_jwt_reads_wrapped_backend_once(self):
+        FileCacheBackend(self.key).set_jwt('token123')
+
+        with mock.patch.object(FileCacheBackend, 'get_jwt', return_value='token123') as get_jwt_mock:
+            self.assertEqual(MemoryCacheBackend(self.key).get_jwt(), 'token123')
+            self.assertEqual(MemoryCacheBackend(self.key).get_jwt(), 'token123')
+
+        get_jwt_mock.assert_called_once_with()
+
+    def test_get_jwt_expired(self):
+        expired_token = build_jwt({'exp': time.time() - 1})
+        MemoryCacheBackend(self.key).set_jwt(expired_token)
+
+        with mock.patch.object(FileCacheBackend, 'get_jwt', return_value=None) as get_jwt_mock:
+            self.assertIsNone(MemoryCacheBackend(self.key).get_jwt())
+
+        get_jwt_mock.assert_called_once_with()
+
+    def test_set_jwt(self):
+        MemoryCacheBackend(self.key).set_jwt('token123')
+        MemoryCacheBackend(self.key).set_jwt('token456')
+
+        self.assertEqual(MemoryCacheBackend(self.key).get_jwt(), 'token456')
+        self.assertEqual(FileCacheBackend(self.key).get_jwt(), 'token456')
+
+    def test_lock_reads_wrapped_backend(self):
+        MemoryCacheBackend(self.key).set_jwt('token123')
+        FileCacheBackend(self.key).set_jwt('token-from-another-process')
+
+        backend = MemoryCacheBackend(self.key)
+        self.assertEqual(backend.get_jwt(), 'token123')
+
+        with backend.lock():
+            self.assertEqual(backend.get_jwt(), 'token-from-another-process')
+
+    def test_get_many(self):
+        other_key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+
+        MemoryCacheBackend(self.key).set_jwt('token123')
+        FileCacheBackend(other_key).set_jwt('token456')
+
+        actual_result = MemoryCacheBackend.get_many([self.key, other_key, 'jwt-test-missing'])
+
+        self.assertDictEqual(actual_result, {self.key: 'token123', other_key: 'token456', 'jwt-test-missing': None})
+
+        with mock.patch.object(FileCacheBackend, 'get_jwt') as get_jwt_mock:
+            self.assertEqual(MemoryCacheBackend(other_key).get_jwt(), 'token456')
+
+        self.assertEqual(get_jwt_mock.call_count, 0)
+
+    def test_set_many(self):
+        other_key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+
+        MemoryCacheBackend.set_many({self.key: 'token123', other_key: 'token456'})
+
+        self.assertEqual(MemoryCacheBackend(self.key).get_jwt(), 'token123')
+        self.assertEqual(FileCacheBackend(other_key).get_jwt(), 'token456')
+
+    def test_memory_only(self):
+        class MemoryOnlyCacheBackend(MemoryCacheBackend):
+            wrapped_backend_class = None
+
+        self.assertIsNone(MemoryOnlyCacheBackend(self.key).get_jwt())
+
+        MemoryOnlyCacheBackend(self.key).set_jwt('token123')
+
+        with MemoryOnlyCacheBackend(self.key).lock():
+            self.assertEqual(MemoryOnlyCacheBackend(self.key).get_jwt(), 'token123')
+
+
+class MemoryRateLimitBackendTestCase(TestCase):
+    def setUp(self):
+        self.key = 'rate-limit-test-{}'.format(uuid.uuid4().hex)
+
+    @mock.patch('drf_requests_jwt.backends.memory_cache.time.time', return_value=100)
+    def test_reserve_shared_per_key(self, time_mock):
+        class SlowMemoryRateLimitBackend(MemoryRateLimitBackend):
+            rate = 2
+            burst = 1
+
+        delays = [SlowMemoryRateLimitBackend(self.key).reserve() for _ in range(3)]
+        other_delay = SlowMemoryRateLimitBackend('other-{}'.format(self.key)).reserve()
+
+        self.assertEqual(delays, [0, 0.5, 1])
+        self.assertEqual(other_delay, 0)
+
+    def test_get_arrival_time_burst(self):
+        backend = MemoryRateLimitBackend('rate-limit-a')
+        backend.rate, backend.burst = 10, 2
+
+        arrival_time, delay = backend._get_arrival_time(None, 100)
+        self.assertAlmostEqual(arrival_time, 100.1)
+        self.assertAlmostEqual(delay, -0.1)
+
+        arrival_time, delay = backend._get_arrival_time(arrival_time, 100)
+        self.assertAlmostEqual(delay, 0)
+
+        arrival_time, delay = backend._get_arrival_time(arrival_time, 100)
+        self.assertAlmostEqual(delay, 0.1)
+
+    def test_get_arrival_time_refills(self):
+        backend = MemoryRateLimitBackend('rate-limit-a')
+        backend.rate, backend.burst = 10, 2
+
+        arrival_time, delay = backend._get_arrival_time(100.5, 200)
+
+        self.assertAlmostEqual(arrival_time, 200.1)
+        self.assertAlmostEqual(delay, -0.1)
+
+
+@skipIf(django is None, 'Django is not installed')
+class DjangoCacheBackendTestCase(TestCase):
+    def setUp(self):
+        self.key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+
+    def test_set_jwt(self):
+        DjangoCacheBackend(self.key).set_jwt('token123')
+        self.assertEqual(DjangoCacheBackend(self.key).get_jwt(), 'token123')
+
+    def test_set_jwt_timeout_from_expiry(self):
+        token = build_jwt({'exp': time.time() + 300})
+
+        with mock.patch.object(caches['default'], 'set') as set_mock:
+            DjangoCacheBackend(self.key).set_jwt(token)
+
+        set_mock.assert_called_once_with(BaseBackend(self.key).key, token, mock.ANY)
+        self.assertAlmostEqual(set_mock.call_args[0][2], 300, delta=2)
+
+    def test_set_jwt_expired(self):
+        DjangoCacheBackend(self.key).set_jwt(build_jwt({'exp': time.time() - 1}))
+        self.assertIsNone(DjangoCacheBackend(self.key).get_jwt())
+
+    def test_cache_alias(self):
+        class TokensDjangoCacheBackend(DjangoCacheBackend):
+            cache_alias = 'tokens'
+
+        TokensDjangoCacheBackend(self.key).set_jwt('token123')
+
+        self.assertEqual(TokensDjangoCacheBackend(self.key).get_jwt(), 'token123')
+        self.assertIsNone(DjangoCacheBackend(self.key).get_jwt())
+
+    def test_get_many_set_many(self):
+        other_key = 'jwt-test-{}'.format(uuid.uuid4().hex)
+        token = build_jwt({'exp': time.time() + 300})
+
+        DjangoCacheBackend.set_many({self.key: 'token123', other_key: token})
+
+        self.assertDictEqual(DjangoCacheBackend.get_many([self.key, other_key, 'jwt-test-missing']), {
+            self.key: 'token123',
+            other_key: token,
+            'jwt-test-missing': None,
+        })
+
+    def test_set_many_timeout_per_token(self):
+        tokens = {
+            'jwt-test-a': build_jwt({'exp': time.time() + 300}),
+            'jwt-test-b': build_jwt({'exp': time.time() + 3600}),
+            'jwt-test-c': 'token123',
+        }
+
+        with mock.patch.object(DjangoCacheBackend, 'get_cache') as get_cache_mock:
+            DjangoCacheBackend.set_many(tokens)
+
+        timeouts = {
+            next(iter(call.args[0])): call.args[1] for call in get_cache_mock.return_value.set_many.call_args_list
+        }
+        self.assertEqual(len(timeouts), 3)
+        self.assertAlmostEqual(timeouts['jwt-test-a'], 300, delta=2)
+        self.assertAlmostEqual(timeouts['jwt-test-b'], 3600, delta=2)
+        self.assertIs(timeouts['jwt-test-c'], DEFAULT_TIMEOUT)
+
+    def test_lock_single_flight(self):
+        logins = []
+
+        def get_token():
+            backend = DjangoCacheBackend(self.key)
+            with backend.lock():
+                if backend.get_jwt() is None:
+                    time.sleep(0.05)
+                    logins.append(1)
+                    backend.set_jwt('token123')
+
+        threads = [threading.Thread(target=get_token) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(logins), 1)
+        self.assertIsNone(caches['default'].get('{}-lock'.format(BaseBackend(self.key).key)))
+
+
+@skipIf(django is None, 'Django is not installed')
+class DjangoCacheStoreBackendTestCase(TestCase):
+    def test_get_set_delete(self):
+        key = 'checkpoint-test-{}'.format(uuid.uuid4().hex)
+
+        self.assertIsNone(DjangoCacheStoreBackend(key).get())
+
+        DjangoCacheStoreBackend(key).set({'next': 'http://base/?page=2', 'count': 10})
+        self.assertDictEqual(DjangoCacheStoreBackend(key).get(), {'next': 'http://base/?page=2', 'count': 10})
+
+        DjangoCacheStoreBackend(key).delete()
+        self.assertIsNone(DjangoCacheStoreBackend(key).get())
+
+
+@skipIf(django is None, 'Django is not installed')
+class DjangoCacheRateLimitBackendTestCase(TestCase):
+    @mock.patch('drf_requests_jwt.backends.django_cache.time.time', return_value=100)
+    def test_reserve_shared_through_the_cache(self, time_mock):
+        class SlowDjangoCacheRateLimitBackend(DjangoCacheRateLimitBackend):
+            rate = 2
+            burst = 1
+
+        key = 'rate-limit-test-{}'.format(uuid.uuid4().hex)
+        delays = [SlowDjangoCacheRateLimitBackend(key).reserve() for _ in range(3)]
+
+        self.assertEqual(delays, [0, 0.5, 1])
+        self.assertEqual(caches['default'].get(BaseBackend(key).key), 101.5)
+        self.assertIsNone(caches['default'].get('{}-lock'.format(BaseBackend(key).key)))
+
+    def test_reserve_no_burst_across_windows(self):
+        class SlowDjangoCacheRateLimitBackend(DjangoCacheRateLimitBackend):
+            rate = 1
+            burst = 2
+
+        key = 'rate-limit-test-{}'.format(uuid.uuid4().hex)
+
+        with mock.patch('drf_requests_jwt.backends.django_cache.time.time', return_value=101.9):
+            delays = [SlowDjangoCacheRateLimitBackend(key).reserve() for _ in range(2)]
+        with mock.patch('drf_requests_jwt.backends.django_cache.time.time', return_value=102):
+            delays.append(SlowDjangoCacheRateLimitBackend(key).reserve())
+
+        self.assertEqual(delays[:2], [0, 0])
+        self.assertAlmostEqual(delays[2], 0.9)
+
+    @mock.patch('drf_requests_jwt.backends.django_cache.time.sleep')
+    def test_reserve_waits_for_the_lock(self, sleep_mock):
+        key = 'rate-limit-test-{}'.format(uuid.uuid4().hex)
+        lock_key = '{}-lock'.format(BaseBackend(key).key)
+        caches['default'].set(lock_key, 'other', 5)
+        sleep_mock.side_effect = lambda seconds: caches['default'].delete(lock_key)
+
+        self.assertEqual(DjangoCacheRateLimitBackend(key).reserve(), 0)
+        self.assertEqual(sleep_mock.call_count, 1)
@@ -1,8 +1,37 @@
-from unittest import TestCase
+from unittest import TestCase, skipIf
 
 import mock
 
-from drf_requests_jwt.deserializers import ObjectListDeserializerMixin
+from drf_requests_jwt.deserializers import ObjectListDeserializerMixin, _iter_page_chunks, _validate_records
+
+try:
+    from rest_framework import serializers
+except ImportError:
+    serializers = None
+else:
+    # Defined at the module level, so that the worker processes can unpickle it.
+    class DeviceSerializer(serializers.Serializer):
+        eui = serializers.CharField(max_length=4)
+
+        def create(self, validated_data):
+            return dict(validated_data, saved=True)
+
+    class SaveHookDeviceSerializer(DeviceSerializer):
+        def save(self, **kwargs):
+            return dict(super().save(**kwargs), hooked=True, eui=self.initial_data['eui'])
+
+
+def serve_pages(instance, pages):
+    """
+    Serve the pages to the mixin the way the service does, starting without a checkpoint.
+    """
+    next_links = ['http://base/?page={}'.format(page) for page in range(2, len(pages) + 1)] + [None]
+
+    instance._get_checkpoint = mock.Mock(return_value=('http://base/', 0))
+    instance._iter_page_links = mock.Mock(return_value=iter(list(zip(pages, next_links))))
+    instance._save_progress = mock.Mock(side_effect=lambda results, next_link, record_count, watermark: (
+        record_count + len(results), watermark
+    ))
 
 
 class ObjectListDeserializerMixinTestCase(TestCase):
@@ -12,7 +41,7 @@ class ObjectListDeserializerMixinTestCase(TestCase):
 
     def test_get_deserialized_object_list_all_valid(self):
         instance = ObjectListDeserializerMixin()
-        instance.get_results_from_all_pages = mock.Mock(return_value=[{'k': 'o1'}, {'k': 'o2'}, {'k': 'o3'}])
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}, {'k': 'o3'}]])
         instance.serializer_class = mock.Mock()
 
         object1 = mock.Mock()
@@ -29,8 +58,6 @@ class ObjectListDeserializerMixinTestCase(TestCase):
 
         self.assertListEqual(actual_result, [object1, object2, object3])
 
-        instance.get_results_from_all_pages.assert_called_once_with()
-
         instance.serializer_class.assert_any_call(data={'k': 'o1'})
         instance.serializer_class.assert_any_call(data={'k': 'o2'})
         instance.serializer_class.assert_any_call(data={'k': 'o3'})
@@ -39,7 +66,7 @@ class ObjectListDeserializerMixinTestCase(TestCase):
 
     def test_get_deserialized_object_list_one_invalid(self):
         instance = ObjectListDeserializerMixin()
-        instance.get_results_from_all_pages = mock.Mock(return_value=[{'k': 'o1'}, {'k': 'o2'}, {'k': 'o3'}])
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}, {'k': 'o3'}]])
         instance.serializer_class = mock.Mock()
 
         object1 = mock.Mock()
@@ -55,11 +82,269 @@ class ObjectListDeserializerMixinTestCase(TestCase):
         actual_result = instance.get_deserialized_object_list()
 
         self.assertListEqual(actual_result, [object1, object3])
-
-        instance.get_results_from_all_pages.assert_called_once_with()
+        self.assertListEqual(instance.deserialization_errors, [{'data': {'k': 'o2'}, 'errors': serializer2.errors}])
 
         instance.serializer_class.assert_any_call(data={'k': 'o1'})
         instance.serializer_class.assert_any_call(data={'k': 'o2'})
         instance.serializer_class.assert_any_call(data={'k': 'o3'})
 
         self.assertEqual(instance.serializer_class.call_count, 3)
+
+    def test_get_deserialized_object_list_saves_progress_once_saved(self):
+        instance = ObjectListDeserializerMixin()
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}], [{'k': 'o3'}]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=True),
+            save=mock.Mock(side_effect=ValueError if data['k'] == 'o3' else None, return_value=data['k'])
+        ))
+        instance.pipeline_chunk_size = 2
+
+        self.assertRaises(ValueError, instance.get_deserialized_object_list)
+
+        instance._save_progress.assert_called_once_with(
+            [{'k': 'o1'}, {'k': 'o2'}], 'http://base/?page=2', 0, None
+        )
+
+    def test_iter_deserialized_chunks(self):
+        instance = ObjectListDeserializerMixin()
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}], [{'k': 'o3'}]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=data['k'] != 'o2'),
+            save=mock.Mock(return_value=data['k']),
+            errors={'k': ['Invalid.']}
+        ))
+        instance.pipeline_chunk_size = 2
+
+        self.assertListEqual(list(instance.iter_deserialized_chunks()), [['o1'], ['o3']])
+        self.assertListEqual(instance.deserialization_errors, [{'data': {'k': 'o2'}, 'errors': {'k': ['Invalid.']}}])
+
+    def test_iter_deserialized_objects(self):
+        instance = ObjectListDeserializerMixin()
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}], [{'k': 'o3'}]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=True),
+            save=mock.Mock(return_value=data['k'])
+        ))
+
+        self.assertListEqual(list(instance.iter_deserialized_objects()), ['o1', 'o2', 'o3'])
+
+    def test_get_deserialized_object_list_strips_fields(self):
+        instance = ObjectListDeserializerMixin()
+        instance.fields = ['k', 'v']
+        serve_pages(instance, [[
+            {'k': 'o1', 'v': 1, 'extra': 'x'}, {'k': 'o2', 'nested': {'a': 1}}
+        ]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=True),
+            save=mock.Mock(return_value=data)
+        ))
+
+        self.assertListEqual(instance.get_deserialized_object_list(), [{'k': 'o1', 'v': 1}, {'k': 'o2'}])
+
+    def test_get_fields(self):
+        instance = ObjectListDeserializerMixin()
+        instance.serializer_class = mock.Mock()
+
+        self.assertIsNone(instance._get_fields())
+
+        instance.fields = ['k']
+        self.assertListEqual(instance._get_fields(), ['k'])
+        self.assertEqual(instance.serializer_class.call_count, 0)
+
+    @skipIf(serializers is None, 'Django REST framework is not installed')
+    def test_get_fields_from_serializer(self):
+        class ReadOnlyIdDeviceSerializer(DeviceSerializer):
+            id = serializers.IntegerField(read_only=True)
+            name = serializers.CharField(required=False)
+
+        instance = ObjectListDeserializerMixin()
+        instance.serializer_class = ReadOnlyIdDeviceSerializer
+        instance.fields_from_serializer = True
+
+        self.assertListEqual(instance._get_fields(), ['eui', 'name'])
+
+    def test_iter_deserialized_chunks_saves_progress_once_pages_are_saved(self):
+        instance = ObjectListDeserializerMixin()
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}, {'k': 'o3'}], [], [{'k': 'o4'}]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=True),
+            save=mock.Mock(return_value=data['k'])
+        ))
+        instance.pipeline_chunk_size = 2
+
+        chunks = instance.iter_deserialized_chunks()
+
+        self.assertListEqual(next(chunks), ['o1', 'o2'])
+        self.assertEqual(instance._save_progress.call_count, 0)
+
+        self.assertListEqual(next(chunks), ['o3', 'o4'])
+        self.assertListEqual([call[0][1:3] for call in instance._save_progress.call_args_list], [
+            ('http://base/?page=2', 0), ('http://base/?page=3', 3), (None, 3)
+        ])
+        self.assertRaises(StopIteration, next, chunks)
+
+
+class IterPageChunksTestCase(TestCase):
+    def test_iter_page_chunks(self):
+        page1, page2, page3, page4 = ([1, 2, 3], 'p2'), ([], 'p3'), ([4], 'p4'), ([5, 6], None)
+
+        self.assertListEqual(list(_iter_page_chunks([page1, page2, page3, page4], 2)), [
+            ([1, 2], []), ([3, 4], [page1, page2, page3]), ([5, 6], [page4])
+        ])
+
+    def test_iter_page_chunks_empty_last_page(self):
+        page1, page2 = ([1, 2], 'p2'), ([], None)
+
+        self.assertListEqual(list(_iter_page_chunks([page1, page2], 2)), [([1, 2], [page1]), ([], [page2])])
+
+
+@skipIf(serializers is None, 'Django REST framework is not installed')
+class BulkObjectListDeserializerMixinTestCase(TestCase):
+    def setUp(self):
+        from django.db import connection
+
+        from drf_requests_jwt.tests.models import Device
+
+        class DeviceModelSerializer(serializers.ModelSerializer):
+            class Meta:
+                model = Device
+                fields = ['eui', 'name']
+
+        # The in-memory database goes away with its connection, so the table is created for each test.
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(Device)
+        self.addCleanup(self._delete_model, Device)
+
+        self.model = Device
+        self.instance = ObjectListDeserializerMixin()
+        self.instance.serializer_class = DeviceModelSerializer
+        self.instance.bulk_batch_size = 2
+
+    def _delete_model(self, model):
+        from django.db import connection
+
+        with connection.schema_editor() as schema_editor:
+            schema_editor.delete_model(model)
+
+    def test_get_deserialized_object_list_bulk_create(self):
+        serve_pages(self.instance, [[
+            {'eui': 'e1'}, {'eui': 'e2' * 10}, {'eui': 'e3'}, {'eui': 'e4'}
+        ]])
+
+        manager = self.model._default_manager
+        with mock.patch.object(manager, 'bulk_create', wraps=manager.bulk_create) as bulk_create_mock:
+            actual_result = self.instance.get_deserialized_object_list()
+
+        self.assertListEqual([device.eui for device in actual_result], ['e1', 'e3', 'e4'])
+        self.assertEqual(bulk_create_mock.call_count, 2)
+        self.assertListEqual(sorted(self.model.objects.values_list('eui', flat=True)), ['e1', 'e3', 'e4'])
+        self.assertListEqual([error['data'] for error in self.instance.deserialization_errors], [{'eui': 'e2' * 10}])
+
+    def test_get_deserialized_object_list_bulk_update(self):
+        existing_device = self.model.objects.create(eui='e2', name='old')
+        self.instance.bulk_lookup_field = 'eui'
+        serve_pages(self.instance, [[
+            {'eui': 'e1', 'name': 'new'}, {'eui': 'e2', 'name': 'renamed'}
+        ]])
+
+        actual_result = self.instance.get_deserialized_object_list()
+
+        self.assertListEqual(self.instance.deserialization_errors, [])
+        self.assertListEqual([device.eui for device in actual_result], ['e1', 'e2'])
+        self.assertEqual(actual_result[1].pk, existing_device.pk)
+        self.assertDictEqual(dict(self.model.objects.values_list('eui', 'name')), {'e1': 'new', 'e2': 'renamed'})
+
+    def test_get_deserialized_object_list_bulk_create_keeps_unique_validation(self):
+        self.model.objects.create(eui='e1')
+        serve_pages(self.instance, [[{'eui': 'e1'}]])
+
+        self.assertListEqual(self.instance.get_deserialized_object_list(), [])
+        self.assertListEqual(list(self.instance.deserialization_errors[0]['errors']), ['eui'])
+
+
+@skipIf(serializers is None, 'Django REST framework is not installed')
+class ValidateRecordsTestCase(TestCase):
+    def test_validate_records(self):
+        actual_result = _validate_records(DeviceSerializer, [{'eui': 'ab'}, {'eui': 'abcdef'}, {'eui': 'cd'}])
+
+        self.assertListEqual([validated_data for _, validated_data, _ in actual_result], [
+            {'eui': 'ab'}, None, {'eui': 'cd'}
+        ])
+        self.assertListEqual(list(actual_result[1][2]), ['eui'])
+
+    def test_validate_records_initial_data(self):
+        class RawDeviceSerializer(DeviceSerializer):
+            def validate(self, attrs):
+                return dict(attrs, raw=self.initial_data['eui'])
+
+        actual_result = _validate_records(RawDeviceSerializer, [{'eui': 'ab'}])
+
+        self.assertDictEqual(actual_result[0][1], {'eui': 'ab', 'raw': 'ab'})
+
+
+@skipIf(serializers is None, 'Django REST framework is not installed')
+class ParallelValidationTestCase(TestCase):
+    def setUp(self):
+        self.instance = ObjectListDeserializerMixin()
+        self.instance.serializer_class = DeviceSerializer
+        self.instance.validation_workers = 2
+
+    def test_get_deserialized_object_list(self):
+        records = [{'eui': 'e{}'.format(i)} for i in range(7)] + [{'eui': 'abcdef'}, {'eui': 'ff'}]
+        serve_pages(self.instance, [records])
+
+        with mock.patch.object(ObjectListDeserializerMixin, '_close_db_connections') as close_db_connections_mock:
+            actual_result = self.instance.get_deserialized_object_list()
+
+        self.assertListEqual(actual_result, [
+            dict(record, saved=True) for record in records if record['eui'] != 'abcdef'
+        ])
+        self.assertListEqual([error['data'] for error in self.instance.deserialization_errors], [{'eui': 'abcdef'}])
+        self.assertListEqual(list(self.instance.deserialization_errors[0]['errors']), ['eui'])
+        close_db_connections_mock.assert_called_once_with()
+        self.assertIsNone(self.instance.validation_executor)
+
+    def test_get_deserialized_object_list_in_atomic_block(self):
+        from django.db import transaction
+
+        serve_pages(self.instance, [[{'eui': 'a'}, {'eui': 'b'}]])
+
+        with mock.patch.object(ObjectListDeserializerMixin, '_close_db_connections') as close_db_connections_mock:
+            with transaction.atomic():
+                actual_result = self.instance.get_deserialized_object_list()
+
+        self.assertListEqual(actual_result, [{'eui': 'a', 'saved': True}, {'eui': 'b', 'saved': True}])
+        self.assertEqual(close_db_connections_mock.call_count, 0)
+
+    def test_get_deserialized_object_list_saves_with_serializer(self):
+        self.instance.serializer_class = SaveHookDeviceSerializer
+        serve_pages(self.instance, [[{'eui': 'a'}, {'eui': 'b'}]])
+
+        with mock.patch.object(ObjectListDeserializerMixin, '_close_db_connections'):
+            actual_result = self.instance.get_deserialized_object_list()
+
+        self.assertListEqual(actual_result, [
+            {'eui': 'a', 'saved': True, 'hooked': True}, {'eui': 'b', 'saved': True, 'hooked': True}
+        ])
+
+    def test_iter_deserialized_chunks_forks_before_fetching(self):
+        def iter_page_links(next_url):
+            # Forked ahead of the fetch thread.
+            self.assertTrue(self.instance.validation_executor._processes)
+            yield [{'eui': 'a'}], None
+
+        serve_pages(self.instance, [])
+        self.instance._iter_page_links = iter_page_links
+
+        with mock.patch.object(ObjectListDeserializerMixin, '_close_db_connections'):
+            self.assertListEqual(list(self.instance.iter_deserialized_chunks()), [[{'eui': 'a', 'saved': True}]])
+
+    def test_iter_deserialized_chunks(self):
+        serve_pages(self.instance, [[{'eui': 'a'}, {'eui': 'b'}], [{'eui': 'c'}]])
+        self.instance.pipeline_chunk_size = 2
+
+        actual_result = list(self.instance.iter_deserialized_chunks())
+
+        self.assertListEqual(actual_result, [
+            [{'eui': 'a', 'saved': True}, {'eui': 'b', 'saved': True}], [{'eui': 'c', 'saved': True}]
+        ])
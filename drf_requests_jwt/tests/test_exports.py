@@ -0,0 +1,91 @@
+import gzip
+import json
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestCase, skipIf
+
+from drf_requests_jwt import exports
+
+
+class ExportsTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+        self.file_path = os.path.join(self.directory, 'devices.json')
+        self.pages = [[{'id': 1}, {'id': 2}], [], [{'id': 3}]]
+
+    def test_write_json_array(self):
+        with exports.open_export_file(self.file_path) as output:
+            count = exports.write_pages(output, iter(self.pages))
+
+        with open(self.file_path) as f:
+            self.assertListEqual(json.load(f), [{'id': 1}, {'id': 2}, {'id': 3}])
+        self.assertEqual(count, 3)
+
+    def test_write_json_array_empty(self):
+        with exports.open_export_file(self.file_path) as output:
+            exports.write_pages(output, iter([[]]))
+
+        with open(self.file_path) as f:
+            self.assertListEqual(json.load(f), [])
+
+    def test_write_json_lines_gzip(self):
+        with exports.open_export_file(self.file_path, compression=exports.GZIP) as output:
+            exports.write_pages(output, iter(self.pages), format=exports.JSON_LINES)
+
+        with gzip.open(self.file_path, 'rt') as f:
+            self.assertListEqual([json.loads(line) for line in f], [{'id': 1}, {'id': 2}, {'id': 3}])
+
+    @skipIf(exports.zstandard is None, 'zstandard is not installed')
+    def test_write_json_zstd(self):
+        with exports.open_export_file(self.file_path, compression=exports.ZSTD) as output:
+            exports.write_pages(output, iter(self.pages))
+
+        with open(self.file_path, 'rb') as f:
+            content = exports.zstandard.ZstdDecompressor().stream_reader(f).read()
+        self.assertListEqual(json.loads(content.decode()), [{'id': 1}, {'id': 2}, {'id': 3}])
+
+    def test_open_export_file_failure(self):
+        def pages():
+            yield [{'id': 1}]
+            raise RuntimeError('page failed')
+
+        with self.assertRaises(RuntimeError):
+            with exports.open_export_file(self.file_path) as output:
+                exports.write_pages(output, pages())
+
+        self.assertListEqual(os.listdir(self.directory), [])
+
+    def test_open_export_file_mode(self):
+        umask = os.umask(0o022)
+        self.addCleanup(os.umask, umask)
+
+        with exports.open_export_file(self.file_path) as output:
+            exports.write_pages(output, self.pages)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.file_path).st_mode), 0o644)
+
+    def test_open_export_file_keeps_mode(self):
+        with open(self.file_path, 'w'):
+            pass
+        os.chmod(self.file_path, 0o640)
+
+        with exports.open_export_file(self.file_path) as output:
+            exports.write_pages(output, self.pages)
+
+        self.assertEqual(stat.S_IMODE(os.stat(self.file_path).st_mode), 0o640)
+
+    def test_open_export_file_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            with exports.open_export_file(self.file_path, compression='bz2'):
+                pass
+
+    def test_write_pages_unknown_format(self):
+        with self.assertRaises(ValueError):
+            with exports.open_export_file(self.file_path) as output:
+                exports.write_pages(output, iter(self.pages), format='csv')
+
+        self.assertFalse(os.path.exists(self.file_path))
@@ -0,0 +1,153 @@
+import threading
+import time
+from unittest import TestCase
+
+import mock
+
+from drf_requests_jwt.exceptions import ResponseStatusError
+from drf_requests_jwt.fan_out import FanOutHttpRequestService
+from drf_requests_jwt.services import HttpRequestService
+from drf_requests_jwt.tests.test_services import json_content
+from drf_requests_jwt.tests.test_tokens import build_jwt
+
+
+class DeviceHttpRequestService(HttpRequestService):
+    def _get_base_url(self):
+        return 'mock://host0'
+
+    def _get_url_path(self):
+        return 'api/devices/'
+
+    def _get_jwt_login_url_path(self):
+        return 'api/auth/jwt/login/'
+
+    def _get_username(self):
+        return 'joe'
+
+    def _get_password(self):
+        return 'secret'
+
+
+class SiteHttpRequestService(DeviceHttpRequestService):
+    def _get_url_path(self):
+        return 'api/sites/'
+
+
+class FanOutHttpRequestServiceTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch('drf_requests_jwt.sessions.requests')
+        self.requests_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.object(DeviceHttpRequestService, 'cache_backend_class',
+                                    'drf_requests_jwt.backends.memory_cache.MemoryCacheBackend')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch('drf_requests_jwt.backends.memory_cache.MemoryCacheBackend.wrapped_backend_class', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = mock.patch.dict('drf_requests_jwt.backends.memory_cache._tokens', clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.token = build_jwt({'exp': time.time() + 300, 'jti': self.id()})
+        self.session_mock = self.requests_mock.Session.return_value
+        self.session_mock.post.return_value = mock.Mock(status_code=200, content=json_content({'access': self.token}))
+
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.in_flight_lock = threading.Lock()
+        self.session_mock.get.side_effect = self._get
+
+    def _get(self, url, headers, params):
+        with self.in_flight_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(0.01)
+
+        with self.in_flight_lock:
+            self.in_flight -= 1
+
+        if headers['Authorization'] != 'Bearer {}'.format(self.token):
+            return mock.Mock(status_code=401)
+        if url.endswith('gateways/'):
+            return mock.Mock(status_code=500, headers={}, content=b'Server Error')
+
+        name = url.rstrip('/').rsplit('/', 1)[-1]
+        page = int(params.get('page', ['1'])[0])
+        return mock.Mock(status_code=200, content=json_content({
+            'next': '{}?page={}'.format(url, page + 1) if page < 3 else None,
+            'results': ['{}-{}'.format(name, page)]
+        }))
+
+    def test_get_results_from_all_pages(self):
+        service = FanOutHttpRequestService(DeviceHttpRequestService, {
+            'devices': 'api/devices/',
+            'sites': SiteHttpRequestService,
+        })
+
+        actual_result = service.get_results_from_all_pages()
+
+        self.assertDictEqual(actual_result, {
+            'devices': ['devices-1', 'devices-2', 'devices-3'],
+            'sites': ['sites-1', 'sites-2', 'sites-3'],
+        })
+        self.assertEqual(self.session_mock.post.call_count, 1)
+        self.assertEqual(self.session_mock.get.call_count, 6)
+        for endpoint_service in service.services.values():
+            self.assertIs(endpoint_service.session, service.session)
+        self.assertEqual(self.requests_mock.Session.call_count, 1)
+        self.assertEqual(self.requests_mock.adapters.HTTPAdapter.call_count, 1)
+
+    def test_init_different_credentials(self):
+        class OtherUserSiteHttpRequestService(SiteHttpRequestService):
+            def _get_username(self):
+                return 'jane'
+
+        with self.assertRaises(ValueError):
+            FanOutHttpRequestService(DeviceHttpRequestService, {
+                'devices': 'api/devices/',
+                'sites': OtherUserSiteHttpRequestService,
+            })
+
+    def test_init_different_base_urls(self):
+        class OtherHostSiteHttpRequestService(SiteHttpRequestService):
+            def _get_base_url(self):
+                return 'mock://host1'
+
+        with self.assertRaises(ValueError):
+            FanOutHttpRequestService(DeviceHttpRequestService, {
+                'devices': 'api/devices/',
+                'sites': OtherHostSiteHttpRequestService,
+            })
+
+    def test_iter_pages_limits_requests_in_flight(self):
+        class TwoWorkersFanOutHttpRequestService(FanOutHttpRequestService):
+            max_workers = 2
+
+        service = TwoWorkersFanOutHttpRequestService(DeviceHttpRequestService, {
+            'devices': 'api/devices/',
+            'sites': 'api/sites/',
+            'meters': 'api/meters/',
+        })
+
+        pages = list(service.iter_pages())
+
+        self.assertEqual(len(pages), 9)
+        self.assertListEqual([results for name, results in pages if name == 'meters'], [
+            ['meters-1'], ['meters-2'], ['meters-3']
+        ])
+        self.assertLessEqual(self.max_in_flight, 2)
+
+    def test_iter_pages_error(self):
+        service = FanOutHttpRequestService(DeviceHttpRequestService, {
+            'devices': 'api/devices/',
+            'gateways': 'api/gateways/',
+        })
+        service.services['gateways'].retry_policy.max_attempts = 1
+
+        with self.assertRaises(ResponseStatusError):
+            list(service.iter_pages())
@@ -0,0 +1,139 @@
+from collections import Counter
+from contextlib import contextmanager
+from unittest import TestCase, skipIf
+
+import mock
+
+from drf_requests_jwt import instrumentation
+from drf_requests_jwt.deserializers import ObjectListDeserializerMixin
+from drf_requests_jwt.instrumentation import Instrumentation
+from drf_requests_jwt.services import HttpRequestService
+from drf_requests_jwt.tests.test_deserializers import serve_pages
+from drf_requests_jwt.tests.test_services import BaseHttpRequestServiceTestCase, json_content, set_json_contents
+
+
+class RecordingInstrumentation(Instrumentation):
+    def __init__(self, service):
+        super().__init__(service)
+
+        self.counters = Counter()
+        self.observations = {}
+        self.spans = []
+
+    def increment(self, name, value=1, **labels):
+        self.counters[(name,) + tuple(sorted(labels.values()))] += value
+
+    def observe(self, name, value, **labels):
+        self.observations.setdefault(name, []).append(value)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        self.spans.append(name)
+        yield
+
+
+class InstrumentationTestCase(TestCase):
+    def test_timer(self):
+        with mock.patch.object(Instrumentation, 'observe') as observe_mock:
+            with Instrumentation('DeviceHttpRequestService').timer('page_decode_seconds', kind='page'):
+                pass
+
+        self.assertEqual(observe_mock.call_count, 1)
+        self.assertEqual(observe_mock.call_args[0][0], 'page_decode_seconds')
+        self.assertGreaterEqual(observe_mock.call_args[0][1], 0)
+        self.assertDictEqual(observe_mock.call_args[1], {'kind': 'page'})
+
+
+class ServiceInstrumentationTestCase(BaseHttpRequestServiceTestCase):
+    def setUp(self):
+        self._patch_requests()
+        self._patch_get_cache_backend()
+        self._patch_get_base_url()
+        self._patch_get_username()
+        self._patch_get_password()
+        self._patch_get_url_path()
+        self._patch_get_jwt_login_url_path()
+
+        self.get_cache_backend_mock.return_value.get_jwt.return_value = None
+        self.get_base_url_mock.return_value = 'mock://host0'
+        self.get_jwt_login_url_path_mock.return_value = 'api/auth/jwt/login/'
+
+        self.get_mock = self.requests_mock.Session.return_value.get
+        self.post_mock = self.requests_mock.Session.return_value.post
+
+        patcher = mock.patch.object(
+            HttpRequestService, 'instrumentation_class',
+            'drf_requests_jwt.tests.test_instrumentation.RecordingInstrumentation'
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_results_from_all_pages(self):
+        pages = [
+            json_content({'next': 'mock://host0/?page=2', 'results': ['a']}),
+            json_content({'next': None, 'results': ['b']})
+        ]
+        self.get_mock.side_effect = [
+            mock.Mock(status_code=401),
+            mock.Mock(status_code=200, content=pages[0]),
+            mock.Mock(status_code=200, content=pages[1]),
+        ]
+        set_json_contents(self.post_mock.return_value, [{'access': 'the-token12345'}])
+        self.post_mock.return_value.status_code = 200
+
+        instance = HttpRequestService()
+
+        self.assertListEqual(instance.get_results_from_all_pages(), ['a', 'b'])
+
+        metrics = instance.instrumentation
+        self.assertEqual(metrics.service, 'HttpRequestService')
+        self.assertEqual(metrics.counters[('unauthorized_responses',)], 1)
+        self.assertEqual(metrics.counters[('logins', 'success')], 1)
+        self.assertEqual(metrics.counters[('jwt_cache_misses',)], 2)
+        self.assertEqual(metrics.counters[('page_bytes',)], len(pages[0]) + len(pages[1]))
+        self.assertEqual(len(metrics.observations['page_fetch_seconds']), 2)
+        self.assertEqual(len(metrics.observations['page_decode_seconds']), 2)
+        self.assertListEqual(metrics.spans, ['page', 'login', 'page'])
+
+
+class DeserializerInstrumentationTestCase(TestCase):
+    def test_get_deserialized_object_list(self):
+        instance = ObjectListDeserializerMixin()
+        instance.instrumentation_class = 'drf_requests_jwt.tests.test_instrumentation.RecordingInstrumentation'
+        serve_pages(instance, [[{'k': 'o1'}, {'k': 'o2'}]])
+        instance.serializer_class = mock.Mock(side_effect=lambda data: mock.Mock(
+            is_valid=mock.Mock(return_value=data['k'] == 'o1')
+        ))
+
+        instance.get_deserialized_object_list()
+
+        self.assertEqual(instance.instrumentation.counters[('records_validated',)], 2)
+        self.assertEqual(instance.instrumentation.counters[('records_invalid',)], 1)
+        self.assertEqual(len(instance.instrumentation.observations['validation_seconds']), 1)
+
+
+@skipIf(instrumentation.prometheus_client is None, 'prometheus_client is not installed')
+class PrometheusInstrumentationTestCase(TestCase):
+    def test_increment_and_observe(self):
+        metrics = instrumentation.PrometheusInstrumentation('DeviceHttpRequestService')
+
+        metrics.increment('logins', outcome='success')
+        metrics.observe('page_fetch_seconds', 0.2)
+
+        registry = instrumentation.prometheus_client.REGISTRY
+        self.assertEqual(registry.get_sample_value('drf_requests_jwt_logins_total', {
+            'service': 'DeviceHttpRequestService', 'outcome': 'success'
+        }), 1)
+        self.assertEqual(registry.get_sample_value('drf_requests_jwt_page_fetch_seconds_count', {
+            'service': 'DeviceHttpRequestService'
+        }), 1)
+
+
+@skipIf(instrumentation.otel_trace is None, 'opentelemetry is not installed')
+class OpenTelemetryInstrumentationTestCase(TestCase):
+    def test_span(self):
+        metrics = instrumentation.OpenTelemetryInstrumentation('DeviceHttpRequestService')
+
+        with metrics.span('page', url='mock://host0/'):
+            metrics.increment('logins', outcome='success')
+            metrics.observe('page_fetch_seconds', 0.2)
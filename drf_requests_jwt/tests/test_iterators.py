@@ -0,0 +1,57 @@
+import threading
+import time
+from unittest import TestCase
+
+from drf_requests_jwt.iterators import iter_merged, iter_prefetched
+
+
+class IterPrefetchedTestCase(TestCase):
+    def test_iter_prefetched(self):
+        self.assertListEqual(list(iter_prefetched(iter(range(10)), 2)), list(range(10)))
+
+    def test_iter_prefetched_error(self):
+        def pages():
+            yield 1
+            raise ValueError('page failed')
+
+        items = iter_prefetched(pages(), 2)
+
+        self.assertEqual(next(items), 1)
+        self.assertRaises(ValueError, next, items)
+
+    def test_iter_prefetched_closed(self):
+        closed = threading.Event()
+
+        def pages():
+            try:
+                for page in range(100):
+                    yield page
+            finally:
+                closed.set()
+
+        items = iter_prefetched(pages(), 2)
+
+        self.assertEqual(next(items), 0)
+        items.close()
+
+        self.assertTrue(closed.wait(timeout=5))
+
+
+class IterMergedTestCase(TestCase):
+    def test_iter_merged(self):
+        def slow(items):
+            for item in items:
+                time.sleep(0.005)
+                yield item
+
+        actual_result = list(iter_merged({'a': slow([1, 2, 3]), 'b': iter([4, 5])}, 2))
+
+        self.assertListEqual([item for name, item in actual_result if name == 'a'], [1, 2, 3])
+        self.assertListEqual([item for name, item in actual_result if name == 'b'], [4, 5])
+
+    def test_iter_merged_error(self):
+        def failing():
+            raise ValueError('page failed')
+            yield
+
+        self.assertRaises(ValueError, list, iter_merged({'a': iter(range(3)), 'b': failing()}, 2))
@@ -0,0 +1,36 @@
+from unittest import TestCase, skipIf
+
+from drf_requests_jwt import json_codecs
+
+
+class JsonCodecTestCase(TestCase):
+    codec_class = json_codecs.JsonCodec
+
+    def setUp(self):
+        self.codec = self.codec_class()
+
+    def test_loads(self):
+        actual_result = self.codec.loads('{"next": null, "results": [{"name": "Senzor ă"}]}'.encode('utf-8'))
+
+        self.assertDictEqual(actual_result, {'next': None, 'results': [{'name': 'Senzor ă'}]})
+
+    def test_dumps(self):
+        actual_result = self.codec.dumps({'id': 1, 'name': 'Senzor ă', 'url': 'mock://host/'})
+
+        self.assertIsInstance(actual_result, bytes)
+        self.assertDictEqual(json_codecs.JsonCodec().loads(actual_result), {
+            'id': 1, 'name': 'Senzor ă', 'url': 'mock://host/'
+        })
+
+
+@skipIf(json_codecs.orjson is None, 'orjson is not installed')
+class OrjsonCodecTestCase(JsonCodecTestCase):
+    codec_class = json_codecs.OrjsonCodec
+
+    def test_dumps_big_integer(self):
+        self.assertEqual(self.codec.dumps({'id': 2 ** 70}), '{{"id":{}}}'.format(2 ** 70).encode())
+
+
+@skipIf(json_codecs.ujson is None, 'ujson is not installed')
+class UjsonCodecTestCase(JsonCodecTestCase):
+    codec_class = json_codecs.UjsonCodec
@@ -0,0 +1,42 @@
+from unittest import TestCase
+
+from drf_requests_jwt.page_sizes import PageSizePolicy
+
+
+class AdaptivePageSizePolicy(PageSizePolicy):
+    max_page_size = 1000
+    latency_limit = 2.0
+    bytes_limit = 1000000
+    growth_factor = 2
+
+
+class PageSizePolicyTestCase(TestCase):
+    def test_get_next_page_size_fixed(self):
+        policy = PageSizePolicy()
+
+        self.assertIsNone(policy.get_first_page_size())
+        self.assertIsNone(policy.get_next_page_size(None, 100, 0.1, 1000))
+        self.assertEqual(policy.get_next_page_size(250, 250, 0.1, 1000), 250)
+
+    def test_get_next_page_size_grows(self):
+        policy = AdaptivePageSizePolicy()
+
+        self.assertEqual(policy.get_next_page_size(100, 100, 0.1, 1000), 200)
+        self.assertEqual(policy.get_next_page_size(None, 100, 0.1, 1000), 200)
+        self.assertEqual(policy.get_next_page_size(800, 800, 0.1, 1000), 1000)
+
+    def test_get_next_page_size_keeps_under_limits(self):
+        policy = AdaptivePageSizePolicy()
+
+        self.assertEqual(policy.get_next_page_size(100, 100, 1.5, 1000), 100)
+        self.assertEqual(policy.get_next_page_size(100, 100, 0.1, 600000), 100)
+
+    def test_get_next_page_size_shrinks(self):
+        policy = AdaptivePageSizePolicy()
+
+        self.assertEqual(policy.get_next_page_size(400, 400, 2.5, 1000), 200)
+        self.assertEqual(policy.get_next_page_size(400, 400, 0.1, 2000000), 200)
+        self.assertEqual(policy.get_next_page_size(1, 1, 2.5, 1000), 1)
+
+    def test_get_next_page_size_empty_page(self):
+        self.assertIsNone(AdaptivePageSizePolicy().get_next_page_size(None, 0, 0.1, 1000))
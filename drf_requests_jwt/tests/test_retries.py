@@ -0,0 +1,45 @@
+import time
+from email.utils import formatdate
+from unittest import TestCase
+
+from drf_requests_jwt.retries import RetryPolicy
+
+
+class RetryPolicyTestCase(TestCase):
+    def test_should_retry(self):
+        policy = RetryPolicy()
+
+        self.assertTrue(policy.should_retry(1))
+        self.assertTrue(policy.should_retry(1, 502))
+        self.assertTrue(policy.should_retry(2, 429))
+        self.assertFalse(policy.should_retry(1, 404))
+        self.assertFalse(policy.should_retry(3, 502))
+        self.assertFalse(policy.should_retry(3))
+
+    def test_should_retry_retry_after(self):
+        policy = RetryPolicy()
+        policy.retry_after_max = 60
+
+        self.assertTrue(policy.should_retry(1, 429, '60'))
+        self.assertTrue(policy.should_retry(1, 429, 'not a date'))
+        self.assertFalse(policy.should_retry(1, 429, '3600'))
+        self.assertFalse(policy.should_retry(1, 503, formatdate(time.time() + 3600, usegmt=True)))
+
+        policy.retry_after_max = None
+        self.assertTrue(policy.should_retry(1, 429, '3600'))
+
+    def test_get_delay_backoff(self):
+        policy = RetryPolicy()
+
+        for attempt in range(1, 10):
+            delay = policy.get_delay(attempt)
+            self.assertGreaterEqual(delay, 0)
+            self.assertLessEqual(delay, min(policy.backoff_factor * 2 ** (attempt - 1), policy.backoff_max))
+
+    def test_get_delay_retry_after_seconds(self):
+        self.assertEqual(RetryPolicy().get_delay(1, '7'), 7)
+        # The server tells when to come back, coming back earlier would waste the attempt.
+        self.assertEqual(RetryPolicy().get_delay(1, '3600'), 3600)
+
+    def test_get_delay_retry_after_date(self):
+        self.assertAlmostEqual(RetryPolicy().get_delay(1, formatdate(time.time() + 10, usegmt=True)), 10, delta=1.5)
@@ -0,0 +1,46 @@
+from unittest import TestCase
+
+import mock
+
+from drf_requests_jwt.sessions import SessionBackend, SharedSessionBackend
+
+
+class SessionBackendTestCase(TestCase):
+    def setUp(self):
+        patcher = mock.patch('drf_requests_jwt.sessions.requests')
+        self.requests_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.requests_mock.Session.side_effect = lambda: mock.Mock()
+
+    def test_get_session(self):
+        session = SessionBackend('http://base:1234').get_session()
+
+        self.assertIsNot(session, SessionBackend('http://base:1234').get_session())
+
+        self.requests_mock.adapters.HTTPAdapter.assert_called_with(pool_connections=10, pool_maxsize=10, max_retries=0)
+        session.mount.assert_any_call('http://', self.requests_mock.adapters.HTTPAdapter.return_value)
+        session.mount.assert_any_call('https://', self.requests_mock.adapters.HTTPAdapter.return_value)
+
+    def test_get_session_pool_maxsize(self):
+        SessionBackend('http://base:1234', pool_maxsize=32).get_session()
+
+        self.requests_mock.adapters.HTTPAdapter.assert_called_with(pool_connections=10, pool_maxsize=32, max_retries=0)
+
+    def test_shared_get_session(self):
+        session = SharedSessionBackend('http://shared:1234').get_session()
+
+        self.assertIs(session, SharedSessionBackend('http://shared:1234').get_session())
+        self.assertIsNot(session, SharedSessionBackend('http://other:1234').get_session())
+
+    def test_shared_get_session_pool_maxsize(self):
+        session = SharedSessionBackend('http://shared-pool:1234').get_session()
+
+        self.assertIsNot(session, SharedSessionBackend('http://shared-pool:1234', pool_maxsize=32).get_session())
+        self.requests_mock.adapters.HTTPAdapter.assert_called_with(pool_connections=10, pool_maxsize=32, max_retries=0)
+
+    def test_shared_get_session_blocks_cookies(self):
+        session = SharedSessionBackend('http://shared-cookies:1234').get_session()
+
+        policy = session.cookies.set_policy.call_args[0][0]
+        self.assertTrue(policy.is_not_allowed('shared-cookies'))
@@ -0,0 +1,25 @@
+import base64
+import json
+from unittest import TestCase
+
+from drf_requests_jwt.tokens import get_jwt_expiry
+
+
+def build_jwt(payload):
+    def encode(data):
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b'=').decode()
+
+    return '{}.{}.signature'.format(encode({'alg': 'HS256', 'typ': 'JWT'}), encode(payload))
+
+
+class GetJwtExpiryTestCase(TestCase):
+    def test_get_jwt_expiry(self):
+        self.assertEqual(get_jwt_expiry(build_jwt({'exp': 1600000000, 'user_id': 1})), 1600000000)
+
+    def test_get_jwt_expiry_without_exp(self):
+        self.assertIsNone(get_jwt_expiry(build_jwt({'user_id': 1})))
+
+    def test_get_jwt_expiry_invalid_token(self):
+        self.assertIsNone(get_jwt_expiry('not-a-jwt'))
+        self.assertIsNone(get_jwt_expiry('a.!!!.c'))
+        self.assertIsNone(get_jwt_expiry(None))
@@ -0,0 +1,26 @@
+"""
+Tokens.
+"""
+import base64
+import json
+
+
+def get_jwt_expiry(token):
+    """
+    Return the `exp` claim of a JWT token as a unix timestamp, without verifying the token.
+
+    None is returned when the token can't be decoded or has no `exp` claim.
+    """
+    if not isinstance(token, str):
+        return None
+
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        expiry = json.loads(base64.urlsafe_b64decode(payload)).get('exp')
+    except (IndexError, ValueError, AttributeError):
+        return None
+
+    if isinstance(expiry, (int, float)) and not isinstance(expiry, bool):
+        return expiry
+    return None
@@ -16,8 +16,16 @@ setup(
     license='MIT',
     packages=find_packages(exclude=["tests*"]),
     install_requires=requires,
+    extras_require={
+        'async': ['aiohttp>=3.6'],
+        'zstd': ['zstandard>=0.15'],
+        'orjson': ['orjson>=3'],
+        'ujson': ['ujson>=4'],
+        'prometheus': ['prometheus_client>=0.8'],
+        'opentelemetry': ['opentelemetry-api>=1.0'],
+    },
     setup_requires=['pytest-runner', 'requests'],
-    tests_require=['pytest', 'mock'],
+    tests_require=['pytest', 'mock', 'aiohttp'],
     zip_safe=False,
     classifiers=[
         'Development Status :: 5 - Production/Stable',